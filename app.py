@@ -1,15 +1,22 @@
-from flask import Flask, render_template, request, session, jsonify, redirect, url_for
+from startup_profile import startup
+from flask import Flask, Response, g, render_template, request, session, jsonify, redirect, url_for
 import os
-import pickle
-import pandas as pd
 import numpy as np
-import xgboost as xgb
-from sklearn.preprocessing import StandardScaler, LabelEncoder
-import plotly.graph_objs as go
-import plotly.utils
+import hmac
+import time
 import json
 from datetime import datetime
 import uuid
+from model_manager import ModelManager
+from coalescer import PredictionCoalescer
+from prediction_cache import PredictionCache
+from risk_rules import RISK_RULES, CompiledRules
+from feature_schema import QUESTIONNAIRE_FIELDS, CompiledSchema, SchemaError
+from metrics import Registry, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from http_cache import PreparedBody, StaticAssets
+from session_store import SessionCodec, build_dictionary, create_session_store
+# XGBoost (and sklearn, which it pulls in) is only imported once a model needs it
+startup.mark('imports')
 
 app = Flask(__name__)
 app.secret_key = os.environ.get('SESSION_SECRET')
@@ -20,32 +27,159 @@ if not app.secret_key:
 # Configure Flask to work with Replit
 app.config['SERVER_NAME'] = None
 
-# Load trained model and scaler
-model = None
-scaler = None
-feature_importance_data = None
+# Static files served from memory with fingerprinted URLs, ETags and precompressed variants;
+# other GET responses get ETags and gzip (see http_cache.py)
+static_assets = StaticAssets(app.static_folder)
+static_assets.init_app(app)
+
+# Order of the feature columns the model was trained on
+FEATURE_ORDER = [
+    'age', 'gender', 'academic_year', 'major', 'cgpa', 'residential_status',
+    'sleep_duration', 'dietary_habits', 'physical_activity', 'social_connectedness',
+    'screen_time', 'family_history', 'financial_stress', 'academic_pressure',
+    'treatment_history', 'coping_mechanisms'
+]
+
+# Risk-factor rule table compiled against the model feature order
+compiled_risk_rules = CompiledRules(RISK_RULES, FEATURE_ORDER)
+# Questionnaire decoder (defaults, categorical maps, ranges) writing float32 model rows
+questionnaire_schema = CompiledSchema(QUESTIONNAIRE_FIELDS, FEATURE_ORDER)
+
+# Upper bound on questionnaires accepted by /api/predict-batch in one request
+MAX_BATCH_SIZE = int(os.environ.get('MAX_BATCH_SIZE', 10000))
+
+# Inference backend: 'xgboost' (sklearn wrapper) or 'native' (NumPy tree engine)
+PREDICTION_BACKEND = os.environ.get('PREDICTION_BACKEND', 'xgboost').lower()
+# Larger batches go to XGBoost's multithreaded predictor, which wins past a few rows
+NATIVE_MAX_BATCH = int(os.environ.get('NATIVE_MAX_BATCH', 4))
+# OpenMP threads per XGBoost predict call (0 keeps XGBoost's default of all cores)
+XGBOOST_NTHREAD = int(os.environ.get('XGBOOST_NTHREAD', 0))
+# Warm-up at import so the first request doesn't pay lazy initialization: 'true' preloads
+# shared state and runs warm-up predictions, 'preload' only the shared part (the gunicorn
+# master, before fork), 'false' neither
+WARM_UP = os.environ.get('WARM_UP', 'True').lower()
+
+# Per-prediction feature contributions, computed in the same tree traversal as the score
+EXPLAIN_PREDICTIONS = os.environ.get('EXPLAIN_PREDICTIONS', 'True').lower() == 'true'
+# 'saabas' (path attribution, about the cost of a prediction) or 'treeshap' (exact, far slower on batches)
+EXPLAIN_METHOD = os.environ.get('EXPLAIN_METHOD', 'saabas').lower()
+# Contributions returned per prediction, largest magnitude first
+EXPLAIN_TOP_K = int(os.environ.get('EXPLAIN_TOP_K', 5))
+
+# Micro-batching of concurrent single predictions (window of 0 disables it)
+COALESCE_WINDOW_MS = float(os.environ.get('COALESCE_WINDOW_MS', 0))
+COALESCE_MAX_BATCH = int(os.environ.get('COALESCE_MAX_BATCH', 64))
+
+# LRU cache of model scores keyed on the feature vector (size 0 disables it)
+PREDICTION_CACHE_SIZE = int(os.environ.get('PREDICTION_CACHE_SIZE', 4096))
+PREDICTION_CACHE_QUANTIZE = os.environ.get('PREDICTION_CACHE_QUANTIZE', 'False').lower() == 'true'
+# Rounding applied to continuous features when building cache keys
+CACHE_QUANTIZATION = {'cgpa': 0.05, 'sleep_duration': 0.25, 'screen_time': 0.25}
+
+# Single-file model bundle written by train_model.py (see model_bundle.py)
+MODEL_BUNDLE_PATH = os.environ.get('MODEL_BUNDLE_PATH', './models/mental_health_model.bundle')
+
+# Seconds between checks of the bundle file for a new model (0 disables the watcher)
+MODEL_WATCH_INTERVAL = float(os.environ.get('MODEL_WATCH_INTERVAL', 0))
+# Token required by /admin/reload-model; the endpoint is disabled when unset
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+
+# Server-side store for questionnaire answers and results; the cookie only holds user_id
+# 'sqlite' is shared by all workers on the host, 'memory' is per process
+SESSION_STORE = os.environ.get('SESSION_STORE', 'sqlite').lower()
+SESSION_DB_PATH = os.environ.get('SESSION_DB_PATH', './instance/sessions.db')
+SESSION_TTL_SECONDS = int(os.environ.get('SESSION_TTL_SECONDS', 7 * 24 * 3600))
+SESSION_MAX_ENTRIES = int(os.environ.get('SESSION_MAX_ENTRIES', 10000))
+
+# Strings repeated in every stored session, used as the compression dictionary
+SESSION_DICTIONARY = build_dictionary(
+    [rule.recommendation for rule in RISK_RULES] + [rule.risk_factor for rule in RISK_RULES if rule.risk_factor] +
+    ['XGBoost ML Model', 'Rule-based fallback', 'Low Risk', 'Moderate Risk', 'High Risk',
+     '#28A745', '#FFC107', '#DC3545'] + FEATURE_ORDER +
+    ['questionnaire_data', 'assessment_date', 'latest_prediction', 'mental_health_score', 'risk_level',
+     'risk_color', 'risk_factors', 'recommendations', 'model_used', 'model_version',
+     'feature_contributions', 'feature', 'contribution', 'contribution_method', 'saabas', 'treeshap']
+)
+session_store = create_session_store(SESSION_STORE, SessionCodec(SESSION_DICTIONARY), SESSION_TTL_SECONDS,
+                                     SESSION_DB_PATH, SESSION_MAX_ENTRIES)
+
+prediction_cache = None
+if PREDICTION_CACHE_SIZE > 0:
+    prediction_cache = PredictionCache(
+        PREDICTION_CACHE_SIZE,
+        [CACHE_QUANTIZATION.get(feature, 0) for feature in FEATURE_ORDER] if PREDICTION_CACHE_QUANTIZE else None
+    )
+
+# Owns the model serving requests; replacements are validated and swapped in atomically
+model_manager = ModelManager(MODEL_BUNDLE_PATH, PREDICTION_BACKEND, NATIVE_MAX_BATCH,
+                             nthread=XGBOOST_NTHREAD or None)
+
+# Prometheus metrics served on /metrics (per worker process)
+metrics_registry = Registry()
+STAGE_SECONDS = metrics_registry.histogram(
+    'prediction_stage_seconds', 'Time spent in each prediction stage per call', ['stage'])
+# Bound once so the request path skips the label lookup
+PREPROCESS_SECONDS = STAGE_SECONDS.labels('preprocess')
+SCALE_SECONDS = STAGE_SECONDS.labels('scale')
+PREDICT_SECONDS = STAGE_SECONDS.labels('predict')
+RULES_SECONDS = STAGE_SECONDS.labels('rules')
+REQUEST_SECONDS = metrics_registry.histogram(
+    'http_request_seconds', 'Request handling time by endpoint', ['endpoint'])
+BATCH_ROWS = metrics_registry.histogram(
+    'prediction_batch_rows', 'Questionnaires per /api/predict-batch call', [],
+    buckets=(1, 10, 100, 1000, 10000))
+PREDICTIONS = metrics_registry.counter(
+    'predictions_total', 'Predictions returned, by source (model or rule-based fallback)', ['source'])
+FALLBACKS = metrics_registry.counter(
+    'prediction_fallbacks_total', 'Predictions served by the rule-based fallback, by reason', ['reason'])
+EXCEPTIONS = metrics_registry.counter(
+    'prediction_exceptions_total', 'Exceptions raised while predicting', ['kind'])
+# Export zeros up front so rate() and fallback-ratio alerts work before the first event
+for source in ('model', 'fallback'):
+    PREDICTIONS.inc(source, amount=0)
+for reason in ('model_not_loaded', 'exception'):
+    FALLBACKS.inc(reason, amount=0)
+for kind in ('single', 'batch'):
+    EXCEPTIONS.inc(kind, amount=0)
+metrics_registry.gauge(
+    'model_load_seconds', 'Duration of the last successful model load, including warm-up and validation',
+    value_fn=lambda: model_manager.last_swap_seconds or 0)
+metrics_registry.counter(
+    'model_reloads_total', 'Successful model loads', value_fn=lambda: model_manager.reloads)
+metrics_registry.counter(
+    'model_reload_failures_total', 'Model loads rejected or failed', value_fn=lambda: model_manager.reload_failures)
+if prediction_cache is not None:
+    metrics_registry.counter(
+        'prediction_cache_hits_total', 'Prediction cache hits', value_fn=lambda: prediction_cache.stats()['hits'])
+    metrics_registry.counter(
+        'prediction_cache_misses_total', 'Prediction cache misses', value_fn=lambda: prediction_cache.stats()['misses'])
+
+# Served when no model is loaded
+FALLBACK_FEATURE_IMPORTANCE = PreparedBody(json.dumps({
+    'features': ['Sleep Duration', 'Academic Pressure', 'Social Connectedness', 'Financial Stress', 'Physical Activity'],
+    'importance': [0.25, 0.22, 0.18, 0.20, 0.15]
+}).encode('utf-8'), 'application/json')
+# Serialized once per model rather than on every request
+feature_importance_body = None
+
+@model_manager.on_swap
+def prepare_feature_importance(state):
+    global feature_importance_body
+    feature_importance_body = PreparedBody(json.dumps(state.feature_importance_data).encode('utf-8'), 'application/json')
+
+@model_manager.on_swap
+def clear_prediction_cache(state):
+    """Scores from the previous model are no longer valid"""
+    if prediction_cache is not None:
+        prediction_cache.clear()
 
 def load_model():
-    """Load the trained XGBoost model and preprocessing components"""
-    global model, scaler, feature_importance_data
-    
+    """Load the trained XGBoost model and preprocessing components from the model bundle"""
     try:
-        # Load model
-        with open('./models/xgboost_mental_health_model.pkl', 'rb') as f:
-            model = pickle.load(f)
-        
-        # Load scaler
-        with open('./models/feature_scaler.pkl', 'rb') as f:
-            scaler = pickle.load(f)
-        
-        # Load feature importance
-        feature_importance_df = pd.read_csv('./models/feature_importance.csv')
-        feature_importance_data = {
-            'features': feature_importance_df['feature'].tolist()[:5],  # Top 5 features
-            'importance': feature_importance_df['importance'].tolist()[:5]
-        }
-        
-        print("Model loaded successfully!")
+        # The bundle is memory-mapped, so forked workers share its pages
+        state = model_manager.reload()
+        startup.mark('model_loaded')
+        print(f"Model {state.version} loaded successfully!")
         
     except FileNotFoundError as e:
         print(f"Model files not found: {e}")
@@ -53,262 +187,426 @@ def load_model():
     except Exception as e:
         print(f"Error loading model: {e}")
 
+# Pages without per-request content, rendered and compressed once per process
+STATIC_PAGES = ('index.html', 'questionnaire.html')
+prepared_pages = {}
+
+def prepared_page(template):
+    """Rendered page as a PreparedBody (templates here don't use flashed messages)"""
+    prepared = prepared_pages.get(template)
+    if prepared is None:
+        prepared = prepared_pages[template] = PreparedBody(
+            render_template(template).encode('utf-8'), 'text/html; charset=utf-8')
+    return prepared
+
+# Set once warm-up has run in this process; reported by /readyz
+worker_ready = False
+
+# Questionnaire used for warm-up predictions (every field at its default)
+WARM_UP_QUESTIONNAIRE = {}
+
+def xgboost_on_request_path(state):
+    """Whether requests the native engine can size still need XGBoost (scores or contributions)"""
+    native = state.native_model
+    if native is None:
+        return True
+    return EXPLAIN_PREDICTIONS and (EXPLAIN_METHOD == 'treeshap' or native.node_mean is None)
+
+def preload():
+    """Shared part of warm-up, run before fork so workers get it copy-on-write
+    
+    Deserializes XGBoost when it serves regular requests (in native mode it
+    otherwise stays unloaded until a batch above NATIVE_MAX_BATCH needs it)
+    and renders and compiles the page templates. Makes no predictions, since
+    the OpenMP pool they start doesn't survive fork. Idempotent.
+    """
+    state = model_manager.current
+    if state is not None and xgboost_on_request_path(state):
+        state.xgboost_model()
+    with app.test_request_context():
+        for template in STATIC_PAGES:
+            prepared_page(template)
+    app.jinja_env.get_template('dashboard.html')
+    startup.mark('preloaded')
+
+def warm_up():
+    """Per-process part of warm-up: score once through every loaded prediction path
+    
+    Starts this process's OpenMP pool (after configure_worker's nthread pin)
+    and runs the risk rules; preload() covers anything not done before fork.
+    Goes through the model state directly so metrics and the prediction cache
+    only reflect real traffic.
+    """
+    global worker_ready
+    preload()
+    state = model_manager.current
+    if state is not None:
+        row = preprocess_questionnaire_data(WARM_UP_QUESTIONNAIRE)
+        # The XGBoost batch path is only warmed when XGBoost is already loaded
+        batch_sizes = (1, NATIVE_MAX_BATCH + 1) if state.xgboost_loaded else (1,)
+        for batch_size in batch_sizes:
+            batch = state.scale(np.repeat(row, batch_size, axis=0))
+            state.predict(batch)
+            if EXPLAIN_PREDICTIONS:
+                state.contributions(batch, exact=EXPLAIN_METHOD == 'treeshap')
+        compiled_risk_rules.explain(row)
+    worker_ready = True
+    startup.mark('warmed_up')
+
+def configure_worker(nthread=None):
+    """Per-process setup for a forked server worker: pin XGBoost threads, then warm up"""
+    global worker_ready
+    worker_ready = False
+    if nthread:
+        model_manager.set_nthread(nthread)
+    warm_up()
+
 # Load model on startup
 load_model()
+model_manager.start_watching(MODEL_WATCH_INTERVAL)
+
+@app.before_request
+def ensure_model_watcher():
+    """Restart the model watcher in workers forked after it was started"""
+    model_manager.ensure_watching()
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request_time(response):
+    """Observe request handling time for /metrics"""
+    if 'request_start' in g:
+        REQUEST_SECONDS.observe(time.perf_counter() - g.request_start, request.endpoint or 'unknown')
+    return response
 
 @app.route('/')
 def index():
     """Home page with introduction to the mental health assessment"""
     if 'user_id' not in session:
         session['user_id'] = str(uuid.uuid4())
-    return render_template('index.html')
+    return prepared_page('index.html').response()
 
 @app.route('/questionnaire')
 def questionnaire():
     """Start the comprehensive mental health questionnaire"""
-    return render_template('questionnaire.html')
+    return prepared_page('questionnaire.html').response()
 
 @app.route('/submit-questionnaire', methods=['POST'])
 def submit_questionnaire():
     """Process questionnaire responses and generate prediction"""
     data = request.get_json()
     
-    # Store user responses in session
-    session['questionnaire_data'] = data
-    session['assessment_date'] = datetime.now().isoformat()
-    
     # Process the data and make prediction
-    prediction_result = make_prediction(data)
+    try:
+        prediction_result = make_prediction(data)
+    except SchemaError as e:
+        return jsonify({'error': str(e), 'field': e.field}), 400
     
-    # Store prediction results
-    session['latest_prediction'] = prediction_result
+    # Store responses and results server-side; the cookie only carries the session ID
+    if 'user_id' not in session:
+        session['user_id'] = str(uuid.uuid4())
+    for key in ('questionnaire_data', 'assessment_date', 'latest_prediction'):
+        # Left in cookies issued before results moved to the session store
+        session.pop(key, None)
+    session_store.put(session['user_id'], {
+        'questionnaire_data': data,
+        'assessment_date': datetime.now().isoformat(),
+        'latest_prediction': prediction_result
+    })
     
     return jsonify(prediction_result)
 
+@app.route('/api/predict-batch', methods=['POST'])
+def predict_batch():
+    """Score a JSON array of questionnaires in a single model call"""
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        data = data.get('questionnaires')
+
+    if not isinstance(data, list) or not all(isinstance(item, dict) for item in data):
+        return jsonify({'error': 'Expected a JSON array of questionnaire objects'}), 400
+    if len(data) > MAX_BATCH_SIZE:
+        return jsonify({'error': f'Batch size exceeds the limit of {MAX_BATCH_SIZE}'}), 413
+
+    try:
+        predictions = make_batch_prediction(data)
+    except SchemaError as e:
+        return jsonify({'error': str(e), 'field': e.field, 'index': e.index}), 400
+
+    return jsonify({'count': len(predictions), 'predictions': predictions})
+
+@app.route('/api/cache-stats')
+def cache_stats():
+    """API endpoint for prediction cache counters"""
+    if prediction_cache is None:
+        return jsonify({'enabled': False})
+    return jsonify(dict(prediction_cache.stats(), enabled=True))
+
+@app.route('/admin/reload-model', methods=['POST'])
+def reload_model():
+    """Load, validate and swap in the model bundle on disk without a restart"""
+    if not ADMIN_TOKEN:
+        return jsonify({'error': 'Not found'}), 404
+    if not hmac.compare_digest(request.headers.get('X-Admin-Token', ''), ADMIN_TOKEN):
+        return jsonify({'error': 'Invalid admin token'}), 403
+    
+    previous = model_manager.current.version if model_manager.current else None
+    try:
+        model_manager.reload()
+    except Exception:
+        # The previous model keeps serving
+        return jsonify(dict(model_manager.status(), swapped=False)), 422
+    
+    print(f"Model {model_manager.current.version} swapped in (was {previous})")
+    return jsonify(dict(model_manager.status(), swapped=True, previous_version=previous))
+
+@app.route('/healthz')
+def healthz():
+    """Liveness probe: the process is up and serving requests"""
+    return jsonify({'status': 'ok'})
+
+@app.route('/readyz')
+def readyz():
+    """Readiness probe: a model is loaded and this worker has warmed up"""
+    state = model_manager.current
+    ready = worker_ready and state is not None
+    body = {'ready': ready, 'model_version': state.version if state else None}
+    return jsonify(body), 200 if ready else 503
+
+@app.route('/api/model-status')
+def model_status():
+    """API endpoint for the serving model version and last reload result"""
+    return jsonify(model_manager.status())
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus text-format metrics for this worker"""
+    return Response(metrics_registry.render(), content_type=METRICS_CONTENT_TYPE)
+
+@app.route('/api/startup-report')
+def startup_report():
+    """API endpoint for this worker's boot timings (see startup_profile.py)"""
+    return jsonify(startup.report())
+
 @app.route('/dashboard')
 def dashboard():
     """Personal dashboard with prediction results and statistics"""
-    if 'latest_prediction' not in session:
+    stored = session_store.get(session['user_id']) if 'user_id' in session else None
+    if stored is None:
         return redirect(url_for('questionnaire'))
     
     return render_template('dashboard.html', 
-                         prediction=session['latest_prediction'],
-                         questionnaire_data=session.get('questionnaire_data', {}))
+                         prediction=stored['latest_prediction'],
+                         questionnaire_data=stored.get('questionnaire_data', {}))
 
 @app.route('/api/feature-importance')
 def feature_importance():
     """API endpoint for feature importance data"""
-    if feature_importance_data:
-        return jsonify(feature_importance_data)
-    else:
-        # Fallback data if model not loaded
-        return jsonify({
-            'features': ['Sleep Duration', 'Academic Pressure', 'Social Connectedness', 'Financial Stress', 'Physical Activity'],
-            'importance': [0.25, 0.22, 0.18, 0.20, 0.15]
-        })
+    return (feature_importance_body or FALLBACK_FEATURE_IMPORTANCE).response()
 
 def preprocess_questionnaire_data(questionnaire_data):
-    """Convert questionnaire responses to model features"""
+    """Decode questionnaire responses into a (1, n_features) float32 model row
     
-    # Map categorical variables to numeric values
-    gender_map = {'male': 0, 'female': 1, 'non_binary': 2, 'prefer_not_to_say': 2}
-    academic_year_map = {'1': 1, '2': 2, '3': 3, '4': 4, 'graduate': 5}
-    major_map = {
-        'engineering': 0, 'medicine': 1, 'business': 2, 'arts': 3,
-        'science': 4, 'computer_science': 5, 'social_sciences': 6, 'other': 7
-    }
-    residential_map = {'on_campus': 0, 'off_campus': 1, 'with_family': 2}
-    
-    # Extract and convert features
-    features = {
-        'age': float(questionnaire_data.get('age', 20)),
-        'gender': gender_map.get(questionnaire_data.get('gender', 'male'), 0),
-        'academic_year': academic_year_map.get(questionnaire_data.get('academic_year', '2'), 2),
-        'major': major_map.get(questionnaire_data.get('major', 'other'), 7),
-        'cgpa': float(questionnaire_data.get('cgpa', 3.0)),
-        'residential_status': residential_map.get(questionnaire_data.get('residential_status', 'with_family'), 2),
-        'sleep_duration': float(questionnaire_data.get('sleep_duration', 7)),
-        'dietary_habits': float(questionnaire_data.get('dietary_habits', 3)),
-        'physical_activity': float(questionnaire_data.get('physical_activity', 3)),
-        'social_connectedness': float(questionnaire_data.get('social_connectedness', 3)),
-        'screen_time': float(questionnaire_data.get('screen_time', 6)),
-        'family_history': float(questionnaire_data.get('family_history', 0)),
-        'financial_stress': float(questionnaire_data.get('financial_stress', 2)),
-        'academic_pressure': float(questionnaire_data.get('academic_pressure', 3)),
-        'treatment_history': float(questionnaire_data.get('treatment_history', 0)),
-        'coping_mechanisms': float(questionnaire_data.get('coping_mechanisms', 3))
-    }
-    
-    return features
+    Raises SchemaError for an answer outside its range or categories.
+    """
+    return questionnaire_schema.decode(questionnaire_data)
+
+def preprocess_questionnaires(questionnaires):
+    """Decode a list of questionnaires into one (n, n_features) float32 matrix"""
+    return questionnaire_schema.decode_batch(questionnaires)
 
-def analyze_risk_factors_and_recommendations(features, prediction_score):
+def analyze_risk_factors_and_recommendations(feature_array, prediction_score):
     """Analyze user data to identify risk factors and provide recommendations"""
+    return compiled_risk_rules.explain(feature_array)[0]
+
+def get_risk_level(mental_health_score):
+    """Map a 0-100 mental health score to its risk level and display color"""
+    if mental_health_score >= 80:
+        return "Low Risk", "#28A745"
+    elif mental_health_score >= 60:
+        return "Moderate Risk", "#FFC107"
+    else:
+        return "High Risk", "#DC3545"
+
+def score_feature_matrix(feature_matrix, state=None):
+    """Scale a raw feature matrix and return one model output per row
     
-    risk_factors = []
-    recommendations = []
-    
-    # Sleep analysis
-    if features['sleep_duration'] < 6:
-        risk_factors.append("Insufficient sleep duration")
-        recommendations.append("Aim for 7-9 hours of sleep per night")
-    elif features['sleep_duration'] > 10:
-        risk_factors.append("Excessive sleep duration")
-        recommendations.append("Consider maintaining a regular sleep schedule")
-    
-    # Academic pressure
-    if features['academic_pressure'] >= 4:
-        risk_factors.append("High perceived academic pressure")
-        recommendations.append("Consider stress management techniques and time management skills")
-    
-    # Social connectedness
-    if features['social_connectedness'] <= 2:
-        risk_factors.append("Low social connectedness")
-        recommendations.append("Try to build and maintain social relationships")
-    
-    # Financial stress
-    if features['financial_stress'] >= 4:
-        risk_factors.append("High financial stress")
-        recommendations.append("Seek financial counseling or budgeting assistance")
-    
-    # Physical activity
-    if features['physical_activity'] <= 2:
-        risk_factors.append("Low physical activity level")
-        recommendations.append("Incorporate regular exercise into your routine")
+    With EXPLAIN_PREDICTIONS the output row is the feature contributions
+    followed by the bias, which sum to the score; otherwise it is the score.
+    """
+    state = state or model_manager.current
+    with SCALE_SECONDS.time():
+        feature_matrix_scaled = state.scale(feature_matrix)
+    with PREDICT_SECONDS.time():
+        if EXPLAIN_PREDICTIONS:
+            return state.contributions(feature_matrix_scaled, exact=EXPLAIN_METHOD == 'treeshap')
+        return state.predict(feature_matrix_scaled)
+
+# Queues concurrent single-row requests and scores them as one matrix
+coalescer = None
+if COALESCE_WINDOW_MS > 0:
+    coalescer = PredictionCoalescer(score_feature_matrix, COALESCE_WINDOW_MS, COALESCE_MAX_BATCH)
+
+def predict_raw_scores(feature_matrix, state):
+    """Score a raw feature matrix, serving repeated feature vectors from the cache
     
-    # Screen time
-    if features['screen_time'] >= 10:
-        risk_factors.append("Excessive screen time")
-        recommendations.append("Consider digital wellness practices and screen time limits")
+    Returns the outputs of score_feature_matrix; contributions are cached
+    together with the score they sum to.
+    """
+    output_shape = (len(feature_matrix), len(FEATURE_ORDER) + 1) if EXPLAIN_PREDICTIONS else (len(feature_matrix),)
+    outputs = np.empty(output_shape)
+    if prediction_cache is None:
+        keys, missing = None, list(range(len(feature_matrix)))
+    else:
+        # A request still holding a swapped-out state must not read the new model's scores
+        keys = [prediction_cache.make_key(row, state.version) for row in feature_matrix]
+        missing = []
+        for i, key in enumerate(keys):
+            cached = prediction_cache.get(key)
+            if cached is None:
+                missing.append(i)
+            else:
+                outputs[i] = cached
     
-    # Family history
-    if features['family_history'] >= 0.5:
-        risk_factors.append("Family history of mental health issues")
-        recommendations.append("Consider discussing family history with a healthcare provider")
+    if missing:
+        if coalescer is not None and len(feature_matrix) == 1:
+            # Batched with concurrent single requests scored by the same model state
+            outputs[missing] = coalescer.submit(feature_matrix[0], state)
+        else:
+            outputs[missing] = score_feature_matrix(feature_matrix[missing], state)
+        
+        # Scores from a model swapped out mid-request must not outlive it in the cache
+        if keys is not None and state is model_manager.current:
+            for i in missing:
+                # Copy so a cached row doesn't keep the whole batch array alive
+                prediction_cache.put(keys[i], outputs[i].copy() if EXPLAIN_PREDICTIONS else outputs[i])
     
-    # Coping mechanisms
-    if features['coping_mechanisms'] <= 2:
-        risk_factors.append("Poor coping mechanisms")
-        recommendations.append("Develop healthy coping strategies like mindfulness or hobbies")
+    startup.mark('first_prediction')
+    return outputs
+
+def split_model_outputs(outputs):
+    """Scores and top feature contributions (None when not explaining) from predict_raw_scores"""
+    if outputs.ndim == 1:
+        return outputs, [None] * len(outputs)
+    contributions = outputs[:, :-1]
+    top = np.argsort(-np.abs(contributions), axis=1)[:, :EXPLAIN_TOP_K]
+    return outputs.sum(axis=1), [
+        [{'feature': FEATURE_ORDER[j], 'contribution': round(float(row[j]), 3)} for j in indices]
+        for row, indices in zip(contributions, top.tolist())
+    ]
+
+def build_prediction_result(prediction_score, risk_factors, recommendations, model_used='XGBoost ML Model',
+                            model_version=None, feature_contributions=None):
+    """Turn a raw model output into the response returned to the client"""
+    # Ensure score is in valid range
+    mental_health_score = max(0, min(100, int(round(prediction_score))))
     
-    # Treatment history
-    if features['treatment_history'] >= 1:
-        recommendations.append("Continue following up with mental health professionals")
+    # Determine risk level
+    risk_level, risk_color = get_risk_level(mental_health_score)
     
-    return risk_factors, recommendations
+    return {
+        'mental_health_score': mental_health_score,
+        'risk_level': risk_level,
+        'risk_color': risk_color,
+        'risk_factors': risk_factors,
+        'recommendations': recommendations,
+        'assessment_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'model_used': model_used,
+        'model_version': model_version,
+        # Top features pushing this score up (positive) or down, in score points
+        'feature_contributions': feature_contributions,
+        # 'saabas' path attributions are approximate; only 'treeshap' values are exact SHAP values
+        'contribution_method': EXPLAIN_METHOD if feature_contributions is not None else None
+    }
 
 def make_prediction(questionnaire_data):
     """Make mental health prediction using XGBoost model"""
     try:
-        if model is None or scaler is None:
+        # One model for the whole request, even if a new one is swapped in meanwhile
+        state = model_manager.current
+        if state is None:
             # Fallback to rule-based prediction if model not loaded
+            FALLBACKS.inc('model_not_loaded')
             return make_fallback_prediction(questionnaire_data)
         
-        # Preprocess the data
-        features = preprocess_questionnaire_data(questionnaire_data)
+        with PREPROCESS_SECONDS.time():
+            # Decode straight into a model row in feature order
+            feature_array = preprocess_questionnaire_data(questionnaire_data)
         
-        # Create feature array in the correct order
-        feature_order = [
-            'age', 'gender', 'academic_year', 'major', 'cgpa', 'residential_status',
-            'sleep_duration', 'dietary_habits', 'physical_activity', 'social_connectedness',
-            'screen_time', 'family_history', 'financial_stress', 'academic_pressure',
-            'treatment_history', 'coping_mechanisms'
-        ]
-        
-        feature_array = np.array([features[feature] for feature in feature_order]).reshape(1, -1)
+        # Scale features and make prediction
+        scores, contributions = split_model_outputs(predict_raw_scores(feature_array, state))
         
-        # Scale features
-        feature_array_scaled = scaler.transform(feature_array)
+        # Generate risk factors and recommendations
+        with RULES_SECONDS.time():
+            risk_factors, recommendations = compiled_risk_rules.explain(feature_array)[0]
         
-        # Make prediction
-        prediction_score = model.predict(feature_array_scaled)[0]
+        PREDICTIONS.inc('model')
+        return build_prediction_result(scores[0], risk_factors, recommendations,
+                                       model_version=state.version, feature_contributions=contributions[0])
         
-        # Ensure score is in valid range
-        mental_health_score = max(0, min(100, int(round(prediction_score))))
+    except SchemaError:
+        # Invalid input, not a model failure; the caller reports it to the client
+        raise
+    except Exception as e:
+        print(f"Prediction error: {e}")
+        EXCEPTIONS.inc('single')
+        FALLBACKS.inc('exception')
+        return make_fallback_prediction(questionnaire_data)
+
+def make_batch_prediction(questionnaires):
+    """Make predictions for many questionnaires with one scaler and model call"""
+    if not questionnaires:
+        return []
+    
+    BATCH_ROWS.observe(len(questionnaires))
+    try:
+        with PREPROCESS_SECONDS.time():
+            feature_matrix = preprocess_questionnaires(questionnaires)
         
-        # Determine risk level
-        if mental_health_score >= 80:
-            risk_level = "Low Risk"
-            risk_color = "#28A745"
-        elif mental_health_score >= 60:
-            risk_level = "Moderate Risk"
-            risk_color = "#FFC107"
-        else:
-            risk_level = "High Risk"
-            risk_color = "#DC3545"
+        state = model_manager.current
+        if state is None:
+            FALLBACKS.inc('model_not_loaded', amount=len(questionnaires))
+            return build_fallback_results(feature_matrix)
         
-        # Generate risk factors and recommendations
-        risk_factors, recommendations = analyze_risk_factors_and_recommendations(features, mental_health_score)
+        # Score the whole batch as a single (n, 16) matrix and check every rule in one pass
+        prediction_scores, contributions = split_model_outputs(predict_raw_scores(feature_matrix, state))
+        with RULES_SECONDS.time():
+            explanations = compiled_risk_rules.explain(feature_matrix)
         
-        return {
-            'mental_health_score': mental_health_score,
-            'risk_level': risk_level,
-            'risk_color': risk_color,
-            'risk_factors': risk_factors,
-            'recommendations': recommendations,
-            'assessment_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            'model_used': 'XGBoost ML Model'
-        }
+        PREDICTIONS.inc('model', amount=len(questionnaires))
+        return [
+            build_prediction_result(score, risk_factors, recommendations, model_version=state.version,
+                                    feature_contributions=top)
+            for score, (risk_factors, recommendations), top in zip(prediction_scores, explanations, contributions)
+        ]
         
+    except SchemaError:
+        raise
     except Exception as e:
-        print(f"Prediction error: {e}")
-        return make_fallback_prediction(questionnaire_data)
+        # Score item by item so one malformed questionnaire only affects itself
+        print(f"Batch prediction error: {e}")
+        EXCEPTIONS.inc('batch')
+        return [make_prediction(data) for data in questionnaires]
+
+def build_fallback_results(feature_matrix):
+    """Rule-based results for a feature matrix when the ML model is not available"""
+    fallback_scores = compiled_risk_rules.fallback_scores(feature_matrix)
+    explanations = compiled_risk_rules.explain(feature_matrix)
+    PREDICTIONS.inc('fallback', amount=len(feature_matrix))
+    
+    return [
+        build_prediction_result(score, risk_factors, recommendations, model_used='Rule-based fallback')
+        for score, (risk_factors, recommendations) in zip(fallback_scores, explanations)
+    ]
 
 def make_fallback_prediction(questionnaire_data):
     """Fallback prediction method when ML model is not available"""
-    
-    risk_factors = []
-    recommendations = []
-    
-    # Analyze sleep duration
-    sleep_hours = float(questionnaire_data.get('sleep_duration', 7))
-    if sleep_hours < 6:
-        risk_factors.append("Insufficient sleep")
-        recommendations.append("Aim for 7-9 hours of sleep per night")
-    
-    # Analyze stress levels
-    academic_pressure = int(questionnaire_data.get('academic_pressure', 3))
-    if academic_pressure >= 4:
-        risk_factors.append("High academic pressure")
-        recommendations.append("Consider stress management techniques")
-    
-    # Calculate overall mental health score (0-100)
-    base_score = 75
-    score_adjustments = 0
-    
-    # Adjust score based on various factors
-    if sleep_hours < 6:
-        score_adjustments -= 10
-    if academic_pressure >= 4:
-        score_adjustments -= 8
-    if int(questionnaire_data.get('social_connectedness', 3)) <= 2:
-        score_adjustments -= 6
-    if int(questionnaire_data.get('financial_stress', 2)) >= 4:
-        score_adjustments -= 7
-    if int(questionnaire_data.get('physical_activity', 3)) <= 2:
-        score_adjustments -= 5
-    
-    mental_health_score = max(0, min(100, base_score + score_adjustments))
-    
-    # Determine risk level
-    if mental_health_score >= 80:
-        risk_level = "Low Risk"
-        risk_color = "#28A745"
-    elif mental_health_score >= 60:
-        risk_level = "Moderate Risk"
-        risk_color = "#FFC107"
-    else:
-        risk_level = "High Risk"
-        risk_color = "#DC3545"
-    
-    return {
-        'mental_health_score': mental_health_score,
-        'risk_level': risk_level,
-        'risk_color': risk_color,
-        'risk_factors': risk_factors,
-        'recommendations': recommendations,
-        'assessment_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-        'model_used': 'Rule-based fallback'
-    }
+    return build_fallback_results(preprocess_questionnaire_data(questionnaire_data))[0]
+
+# Warm up after every helper above is defined
+if WARM_UP == 'true':
+    warm_up()
+elif WARM_UP == 'preload':
+    preload()
 
 if __name__ == '__main__':
     # Production-ready settings
@@ -0,0 +1,175 @@
+"""
+ASGI serving mode for app.py
+Request bodies are read and responses written on the event loop, so slow
+clients and large uploads only cost a coroutine. Each fully buffered request
+then runs through the Flask app on a bounded thread pool sized to the usable
+cores, which does the CPU-bound preprocessing and inference. When more
+requests are waiting than ASGI_MAX_PENDING the server answers 503 instead of
+queueing without bound.
+As under gunicorn, XGBoost gets each handler thread's share of the cores, and
+warm-up runs on lifespan startup after that pin; /readyz reports when it is done.
+
+    uvicorn asgi:application --host 0.0.0.0 --port 5000 --workers 2
+"""
+
+import asyncio
+import io
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from cpu_quota import available_cpus
+
+# Threads running Flask handlers (the CPU-bound part) per worker process
+ASGI_THREADS = int(os.environ.get('ASGI_THREADS', 0)) or available_cpus()
+# XGBoost threads per handler: the quota split across handler threads, at least one
+XGBOOST_NTHREAD = int(os.environ.get('XGBOOST_NTHREAD', 0)) or max(1, available_cpus() // ASGI_THREADS)
+# Requests waiting for or holding a thread before new ones get 503
+ASGI_MAX_PENDING = int(os.environ.get('ASGI_MAX_PENDING', 64 * ASGI_THREADS))
+# Largest request body buffered in memory (a 10,000-item batch is about 5 MB)
+ASGI_MAX_BODY_BYTES = int(os.environ.get('ASGI_MAX_BODY_BYTES', 16 * 1024 * 1024))
+
+# Set before app (and XGBoost's OpenMP runtime) is imported, as gunicorn.conf.py does;
+# the import only preloads shared state, and warm-up runs on lifespan startup
+os.environ.setdefault('OMP_NUM_THREADS', str(XGBOOST_NTHREAD))
+os.environ['WARM_UP'] = 'preload'
+
+import app as app_module
+
+
+def build_environ(scope, body):
+    """WSGI environ for an ASGI HTTP scope with an already-read body (PEP 3333)"""
+    server_name, server_port = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': str(server_name),
+        'SERVER_PORT': str(server_port),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value
+        elif name != 'CONTENT_LENGTH':
+            key = f'HTTP_{name}'
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+def run_wsgi(wsgi_app, environ):
+    """Call a WSGI app and return (status code, headers, body bytes)"""
+    response = {}
+
+    def start_response(status, headers, exc_info=None):
+        response['status'] = int(status.split(' ', 1)[0])
+        response['headers'] = headers
+
+    iterable = wsgi_app(environ, start_response)
+    try:
+        body = b''.join(iterable)
+    finally:
+        if hasattr(iterable, 'close'):
+            iterable.close()
+    return response['status'], response['headers'], body
+
+
+class BoundedWSGIApp:
+    """ASGI application running a WSGI app on a bounded thread pool"""
+
+    def __init__(self, wsgi_app, threads, max_pending, max_body_bytes, on_startup=None):
+        self.wsgi_app = wsgi_app
+        # Run on a handler thread before lifespan startup completes
+        self.on_startup = on_startup
+        self.threads = threads
+        self.max_pending = max_pending
+        self.max_body_bytes = max_body_bytes
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='asgi-handler')
+        # Only touched from the event loop thread
+        self.pending = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self._http(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                if self.on_startup is not None:
+                    try:
+                        await asyncio.get_running_loop().run_in_executor(self.executor, self.on_startup)
+                    except Exception as e:
+                        await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                        return
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                # Let in-flight handlers finish
+                self.executor.shutdown(wait=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _read_body(self, receive):
+        chunks, size = [], 0
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return None
+            chunk = message.get('body', b'')
+            size += len(chunk)
+            if size > self.max_body_bytes:
+                return False
+            chunks.append(chunk)
+            if not message.get('more_body', False):
+                return b''.join(chunks)
+
+    async def _respond(self, send, status, headers, body):
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': body})
+
+    async def _http(self, scope, receive, send):
+        # Slow uploads are awaited here without holding a handler thread
+        body = await self._read_body(receive)
+        if body is None:
+            return
+        if body is False:
+            await self._respond(send, 413, [(b'content-type', b'application/json')],
+                                b'{"error": "Request body too large"}')
+            return
+        if self.pending >= self.max_pending:
+            await self._respond(send, 503, [(b'content-type', b'application/json'), (b'retry-after', b'1')],
+                                b'{"error": "Server busy, retry shortly"}')
+            return
+
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            status, headers, response_body = await loop.run_in_executor(
+                self.executor, run_wsgi, self.wsgi_app, build_environ(scope, body)
+            )
+        finally:
+            self.pending -= 1
+
+        await self._respond(send, status, [
+            (name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers
+        ], response_body)
+
+
+application = BoundedWSGIApp(app_module.app, ASGI_THREADS, ASGI_MAX_PENDING, ASGI_MAX_BODY_BYTES,
+                             on_startup=lambda: app_module.configure_worker(XGBOOST_NTHREAD))
@@ -0,0 +1,290 @@
+"""
+Benchmarks for the prediction hot path
+Times each stage of make_prediction (preprocess, scale, predict, rules), the
+full /submit-questionnaire round trip through the Flask test client, batch
+scoring through /api/predict-batch at increasing batch sizes, and the
+create_dataset app's /predict path. Results are written as JSON and compared
+against a stored baseline; regressions beyond the tolerance fail the run.
+
+    python benchmarks/bench_prediction.py [--backend native] [--quick]
+    python benchmarks/bench_prediction.py --save-baseline
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, BENCH_DIR)
+from corpus import corpus_digest, generate_corpus, generate_form_corpus
+
+BASELINE_PATH = os.path.join(BENCH_DIR, 'baseline.json')
+BATCH_SIZES = [1, 10, 100, 1000, 10000]
+# Calls made before timing starts (lazy imports, first-call allocations)
+WARMUP_CALLS = 20
+# Slowdowns smaller than this (in microseconds) are timer noise, not regressions
+MIN_DELTA_US = 5
+
+
+def summarize(durations_ns):
+    """Latency percentiles in microseconds for a list of per-call durations"""
+    us = np.asarray(durations_ns, dtype=np.float64) / 1000
+    return {
+        'n': len(us),
+        'mean_us': round(float(us.mean()), 2),
+        'p50_us': round(float(np.percentile(us, 50)), 2),
+        'p95_us': round(float(np.percentile(us, 95)), 2),
+        'p99_us': round(float(np.percentile(us, 99)), 2)
+    }
+
+
+def time_calls(fn, inputs, warmup=WARMUP_CALLS):
+    """Call fn on every input after a warm-up; returns per-call durations in ns"""
+    for item in inputs[:warmup]:
+        fn(item)
+    durations = []
+    for item in inputs:
+        start = time.perf_counter_ns()
+        fn(item)
+        durations.append(time.perf_counter_ns() - start)
+    return durations
+
+
+def bench_stages(app_module, corpus):
+    """Per-stage and end-to-end latency for single questionnaires"""
+    state = app_module.model_manager.current
+    if state is None:
+        raise RuntimeError("No model loaded; run train_model.py first")
+
+    rows = [app_module.preprocess_questionnaire_data(q) for q in corpus]
+    scaled = [state.scale(row) for row in rows]
+    scores = [float(state.predict(row)[0]) for row in scaled]
+    client = app_module.app.test_client()
+
+    def submit(questionnaire):
+        response = client.post('/submit-questionnaire', json=questionnaire)
+        assert response.status_code == 200
+
+    return {
+        'preprocess': summarize(time_calls(app_module.preprocess_questionnaire_data, corpus)),
+        'scale': summarize(time_calls(state.scale, rows)),
+        'predict': summarize(time_calls(state.predict, scaled)),
+        'rules': summarize(time_calls(
+            lambda i: app_module.analyze_risk_factors_and_recommendations(rows[i], scores[i]),
+            list(range(len(rows)))
+        )),
+        'make_prediction': summarize(time_calls(app_module.make_prediction, corpus)),
+        'submit_questionnaire': summarize(time_calls(submit, corpus))
+    }
+
+
+def bench_batches(app_module, corpus, batch_sizes, max_rows_per_size):
+    """Latency per /api/predict-batch call and rows/s at each batch size"""
+    client = app_module.app.test_client()
+    results = {}
+    for size in batch_sizes:
+        batches = [corpus[(i * size) % len(corpus):][:size] for i in range(max(3, max_rows_per_size // size))]
+        batches = [batch for batch in batches if len(batch) == size]
+
+        def post(batch):
+            response = client.post('/api/predict-batch', json=batch)
+            assert response.status_code == 200
+
+        durations = time_calls(post, batches, warmup=1)
+        summary = summarize(durations)
+        summary['rows_per_s'] = round(size * len(durations) / (sum(durations) / 1e9), 1)
+        results[str(size)] = summary
+    return results
+
+
+def bench_create_dataset(n_samples):
+    """Round trip of create_dataset/app.py /predict with submissions written to a scratch directory"""
+    app_dir = os.path.join(ROOT_DIR, 'create_dataset')
+    with tempfile.TemporaryDirectory(prefix='bench-submissions-') as data_dir:
+        # Keep benchmark submissions out of the real log
+        os.environ['SUBMISSIONS_DIR'] = data_dir
+        sys.path.insert(0, app_dir)
+        spec = importlib.util.spec_from_file_location('create_dataset_app', os.path.join(app_dir, 'app.py'))
+        dataset_app = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(dataset_app)
+        if dataset_app.model is None:
+            return None
+
+        client = dataset_app.app.test_client()
+        forms = generate_form_corpus(dataset_app.feature_cols, n_samples)
+
+        def post(form):
+            response = client.post('/predict', data=form)
+            assert response.status_code == 302
+
+        return summarize(time_calls(post, forms))
+
+
+def merge_runs(runs, pick='best'):
+    """Merge repeated runs of one section metric by metric
+
+    'best' keeps each metric's fastest repeat: interference from other
+    processes only ever adds time. 'median' keeps the typical repeat, which
+    is what a baseline should record.
+    """
+    merged = {}
+    for name in runs[0]:
+        summaries = [run[name] for run in runs]
+        if any(summary is None for summary in summaries):
+            merged[name] = None
+            continue
+        merged[name] = {}
+        for metric in summaries[0]:
+            values = [summary[metric] for summary in summaries]
+            if pick == 'median':
+                merged[name][metric] = round(float(np.median(values)), 2)
+            else:
+                merged[name][metric] = max(values) if metric == 'rows_per_s' else min(values)
+    return merged
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, tolerance, quick=False):
+    """Return (name, metric, baseline, current, ratio) for every regression beyond tolerance
+
+    Slowdowns under MIN_DELTA_US are timer noise and never count; quick runs
+    are too short for a stable p99, so they only compare p50 and p95.
+    """
+    if baseline['meta'].get('corpus_digest') != results['meta']['corpus_digest']:
+        print("Baseline was recorded on a different corpus; skipping comparison")
+        return []
+
+    regressions = []
+    stage_metrics = ['p50_us', 'p95_us'] if quick else ['p50_us', 'p95_us', 'p99_us']
+    sections = [('stages', stage_metrics), ('batches', ['p50_us', 'p95_us'])]
+    for section, metrics in sections:
+        for name, current in results.get(section, {}).items():
+            previous = baseline.get(section, {}).get(name)
+            if not previous or not current:
+                continue
+            for metric in metrics:
+                ratio = current[metric] / previous[metric] if previous[metric] else 1.0
+                if ratio > 1 + tolerance and current[metric] - previous[metric] > MIN_DELTA_US:
+                    regressions.append((f"{section}.{name}", metric, previous[metric], current[metric], ratio))
+    return regressions
+
+
+def print_results(results):
+    print(f"\n{'stage':<24}{'p50 us':>10}{'p95 us':>10}{'p99 us':>10}")
+    for name, summary in results['stages'].items():
+        if summary:
+            print(f"{name:<24}{summary['p50_us']:>10.1f}{summary['p95_us']:>10.1f}{summary['p99_us']:>10.1f}")
+    print(f"\n{'batch size':<24}{'p50 ms':>10}{'p95 ms':>10}{'rows/s':>12}")
+    for size, summary in results['batches'].items():
+        print(f"{size:<24}{summary['p50_us'] / 1000:>10.2f}{summary['p95_us'] / 1000:>10.2f}{summary['rows_per_s']:>12.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the prediction hot path")
+    parser.add_argument('--backend', choices=['xgboost', 'native'], default='xgboost')
+    parser.add_argument('--samples', type=int, default=2000, help="questionnaires timed per stage")
+    parser.add_argument('--batch-rows', type=int, default=20000,
+                        help="rows scored per batch size (at least 3 batches each)")
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=BATCH_SIZES)
+    parser.add_argument('--dataset-samples', type=int, default=500,
+                        help="create_dataset /predict posts (0 skips that app)")
+    parser.add_argument('--cache', action='store_true', help="keep the prediction cache enabled")
+    parser.add_argument('--quick', action='store_true', help="small run for a fast regression check")
+    parser.add_argument('--repeat', type=int, default=3, help="runs per stage; each metric keeps its best run")
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true', help="write the results as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="allowed slowdown vs the baseline before a metric counts as a regression")
+    args = parser.parse_args()
+
+    if args.quick:
+        args.samples, args.batch_rows, args.dataset_samples = 300, 3000, 100
+        args.batch_sizes = [size for size in args.batch_sizes if size <= 1000]
+
+    # The corpus repeats rows across stages, so the cache would measure lookups instead of inference
+    os.environ['PREDICTION_BACKEND'] = args.backend
+    os.environ['PREDICTION_CACHE_SIZE'] = os.environ.get('PREDICTION_CACHE_SIZE', '4096') if args.cache else '0'
+    os.environ['COALESCE_WINDOW_MS'] = '0'
+    os.chdir(ROOT_DIR)
+    import app as app_module
+
+    corpus = generate_corpus()
+    results = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(),
+            'git_commit': git_commit(),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'cpus': os.cpu_count(),
+            'backend': args.backend,
+            'cache': args.cache,
+            'model_version': app_module.model_manager.current.version if app_module.model_manager.current else None,
+            'corpus_digest': corpus_digest(corpus),
+            'samples': args.samples,
+            'repeat': args.repeat
+        }
+    }
+
+    stage_runs, batch_runs = [], []
+    for run in range(1, args.repeat + 1):
+        print(f"Run {run}/{args.repeat}: timing stages over {args.samples} questionnaires ({args.backend} backend)...")
+        stages = bench_stages(app_module, corpus[:args.samples])
+        if args.dataset_samples > 0:
+            print(f"Run {run}/{args.repeat}: timing create_dataset /predict over {args.dataset_samples} posts...")
+            stages['create_dataset_predict'] = bench_create_dataset(args.dataset_samples)
+        stage_runs.append(stages)
+        print(f"Run {run}/{args.repeat}: timing /api/predict-batch at batch sizes {args.batch_sizes}...")
+        batch_runs.append(bench_batches(app_module, corpus, args.batch_sizes, args.batch_rows))
+    # A baseline records typical timings and a check its best run, so a check only
+    # fails when even its fastest repeat is slower than usual
+    pick = 'median' if args.save_baseline else 'best'
+    results['meta']['pick'] = pick
+    results['stages'] = merge_runs(stage_runs, pick)
+    results['batches'] = merge_runs(batch_runs, pick)
+
+    print_results(results)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults saved to {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print("No baseline to compare against (run with --save-baseline)")
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance, args.quick)
+    if regressions:
+        print(f"\nRegressions vs baseline {baseline['meta'].get('git_commit')} (tolerance {args.tolerance:.0%}):")
+        for name, metric, previous, current, ratio in regressions:
+            print(f"  {name} {metric}: {previous:.1f} -> {current:.1f} ({ratio:.2f}x)")
+        sys.exit(1)
+    print(f"No regressions vs baseline {baseline['meta'].get('git_commit')}")
+
+
+if __name__ == '__main__':
+    main()
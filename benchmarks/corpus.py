@@ -0,0 +1,68 @@
+"""
+Fixed corpus of generated questionnaires for the benchmarks
+Uses the stdlib random module with a fixed seed so the corpus is identical
+across machines and numpy versions; corpus_digest() identifies it in results.
+"""
+
+import hashlib
+import json
+import random
+
+CORPUS_SEED = 20240917
+CORPUS_SIZE = 10000
+
+GENDERS = ['male', 'female', 'non_binary', 'prefer_not_to_say']
+ACADEMIC_YEARS = ['1', '2', '3', '4', 'graduate']
+MAJORS = ['engineering', 'medicine', 'business', 'arts', 'science', 'computer_science', 'social_sciences', 'other']
+RESIDENTIAL = ['on_campus', 'off_campus', 'with_family']
+
+
+def generate_questionnaire(rng):
+    """One questionnaire in the JSON shape posted by the questionnaire page"""
+    return {
+        'age': rng.randint(17, 35),
+        'gender': rng.choice(GENDERS),
+        'academic_year': rng.choice(ACADEMIC_YEARS),
+        'major': rng.choice(MAJORS),
+        'cgpa': round(rng.uniform(4.0, 10.0), 1),
+        'residential_status': rng.choice(RESIDENTIAL),
+        'sleep_duration': rng.randint(3, 12),
+        'dietary_habits': rng.randint(1, 5),
+        'physical_activity': rng.randint(1, 5),
+        'social_connectedness': rng.randint(1, 5),
+        'screen_time': rng.randint(1, 16),
+        'family_history': rng.choice([0, 0.5, 1]),
+        'financial_stress': rng.randint(1, 5),
+        'academic_pressure': rng.randint(1, 5),
+        'treatment_history': rng.choice([0, 1, 2]),
+        'coping_mechanisms': rng.randint(1, 5)
+    }
+
+
+def generate_corpus(n=CORPUS_SIZE, seed=CORPUS_SEED):
+    rng = random.Random(seed)
+    return [generate_questionnaire(rng) for _ in range(n)]
+
+
+def generate_form_corpus(feature_cols, n=CORPUS_SIZE, seed=CORPUS_SEED):
+    """Form posts for create_dataset/app.py /predict, in the synthetic dataset's numeric encoding"""
+    rng = random.Random(seed)
+    ranges = {
+        'age': (17, 30), 'academic_year': (1, 4), 'gender': (0, 2), 'major': (0, 3),
+        'residential_status': (0, 2), 'family_history': (0, 1), 'treatment_history': (0, 1)
+    }
+    forms = []
+    for _ in range(n):
+        form = {}
+        for feature in feature_cols:
+            if feature in ranges:
+                form[feature] = str(rng.randint(*ranges[feature]))
+            else:
+                form[feature] = str(round(rng.uniform(1.0, 10.0), 1))
+        forms.append(form)
+    return forms
+
+
+def corpus_digest(corpus):
+    """Short hash of a corpus so results from different corpora are never compared"""
+    return hashlib.sha256(json.dumps(corpus, sort_keys=True).encode('utf-8')).hexdigest()[:16]
@@ -0,0 +1,165 @@
+"""
+Local load comparison: sync gunicorn (as in the Dockerfile) vs the ASGI mode
+Starts each server on a free port, drives /submit-questionnaire with N
+concurrent clients for a fixed time and reports throughput, latency
+percentiles and errors. A fraction of clients upload slowly (headers first,
+body after a delay), which ties up a sync worker but only a coroutine in
+the ASGI server.
+
+    python benchmarks/load_compare.py --concurrency 8 32 128 --duration 10
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, BENCH_DIR)
+from corpus import generate_corpus
+from cpu_quota import available_cpus
+
+REQUEST_TIMEOUT = 30
+
+
+def server_command(mode, port, workers):
+    if mode == 'sync':
+        return [sys.executable, '-m', 'gunicorn', '-w', str(workers), '-b', f'127.0.0.1:{port}', 'app:app']
+    return [sys.executable, '-m', 'uvicorn', 'asgi:application', '--host', '127.0.0.1', '--port', str(port),
+            '--workers', str(workers), '--log-level', 'warning']
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_ready(port, timeout=120):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1) as sock:
+                sock.sendall(b'GET /api/model-status HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n')
+                if sock.recv(64).startswith(b'HTTP/1.1 200'):
+                    return
+        except OSError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"Server on port {port} did not become ready")
+
+
+async def post(port, body, slow_delay):
+    """One POST on a fresh connection; returns the HTTP status"""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    try:
+        writer.write((
+            "POST /submit-questionnaire HTTP/1.1\r\nHost: localhost\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n"
+        ).encode('latin-1'))
+        if slow_delay:
+            await writer.drain()
+            await asyncio.sleep(slow_delay)
+        writer.write(body)
+        await writer.drain()
+        response = await reader.read()
+        return int(response.split(b' ', 2)[1])
+    finally:
+        writer.close()
+
+
+async def client(port, bodies, deadline, slow_delay, results, rng):
+    while time.perf_counter() < deadline:
+        body = bodies[rng.randrange(len(bodies))]
+        start = time.perf_counter()
+        try:
+            status = await asyncio.wait_for(post(port, body, slow_delay), REQUEST_TIMEOUT)
+        except (OSError, asyncio.TimeoutError, IndexError, ValueError):
+            status = None
+        results.append((slow_delay > 0, status, time.perf_counter() - start))
+
+
+async def run_load(port, concurrency, duration, slow_fraction, slow_delay, bodies):
+    results = []
+    deadline = time.perf_counter() + duration
+    n_slow = int(round(concurrency * slow_fraction))
+    tasks = [
+        client(port, bodies, deadline, slow_delay if i < n_slow else 0, results, random.Random(i))
+        for i in range(concurrency)
+    ]
+    start = time.perf_counter()
+    await asyncio.gather(*tasks)
+    return results, time.perf_counter() - start
+
+
+def summarize(results, elapsed):
+    fast = np.array([latency for slow, status, latency in results if not slow and status == 200])
+    statuses = [status for _, status, _ in results]
+    summary = {
+        'requests': len(results),
+        'ok': statuses.count(200),
+        'busy_503': statuses.count(503),
+        'errors': sum(1 for status in statuses if status not in (200, 503)),
+        'throughput_rps': round(statuses.count(200) / elapsed, 1)
+    }
+    if len(fast):
+        summary.update({
+            'p50_ms': round(float(np.percentile(fast, 50)) * 1000, 1),
+            'p95_ms': round(float(np.percentile(fast, 95)) * 1000, 1),
+            'p99_ms': round(float(np.percentile(fast, 99)) * 1000, 1)
+        })
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare sync gunicorn with the ASGI serving mode under load")
+    parser.add_argument('--modes', nargs='+', choices=['sync', 'async'], default=['sync', 'async'])
+    parser.add_argument('--workers', type=int, default=available_cpus(), help="server worker processes")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[8, 32, 128])
+    parser.add_argument('--duration', type=float, default=10, help="seconds per concurrency level")
+    parser.add_argument('--slow-fraction', type=float, default=0.1, help="share of clients that upload slowly")
+    parser.add_argument('--slow-delay', type=float, default=0.5, help="seconds a slow client waits before its body")
+    parser.add_argument('--output', default='load_compare_results.json')
+    args = parser.parse_args()
+
+    bodies = [json.dumps(questionnaire).encode('utf-8') for questionnaire in generate_corpus(1000)]
+    env = dict(os.environ, PREDICTION_CACHE_SIZE='0')
+    report = {'workers': args.workers, 'slow_fraction': args.slow_fraction, 'slow_delay': args.slow_delay, 'runs': []}
+
+    for mode in args.modes:
+        port = free_port()
+        server = subprocess.Popen(server_command(mode, port, args.workers), cwd=ROOT_DIR, env=env,
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            wait_until_ready(port)
+            for concurrency in args.concurrency:
+                results, elapsed = asyncio.run(run_load(
+                    port, concurrency, args.duration, args.slow_fraction, args.slow_delay, bodies
+                ))
+                summary = dict(summarize(results, elapsed), mode=mode, concurrency=concurrency)
+                report['runs'].append(summary)
+                print(f"{mode:<6} c={concurrency:<4} {summary['throughput_rps']:>8.1f} req/s  "
+                      f"p50 {summary.get('p50_ms', float('nan')):>8.1f} ms  "
+                      f"p99 {summary.get('p99_ms', float('nan')):>8.1f} ms  "
+                      f"503s {summary['busy_503']:<5} errors {summary['errors']}")
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""
+Request micro-batching for single-row predictions
+Concurrent callers queue one feature row each; a background thread gathers
+rows for up to a short window and scores them as a single matrix. Each row
+carries the context (the model state) its caller captured, and rows are only
+batched with rows of the same context, so a model swap mid-window never
+scores a request with a model other than the one it reports.
+"""
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+
+class PredictionCoalescer:
+    """Coalesce concurrent single-row predictions into batched model calls
+
+    score_fn(matrix, context) scores a matrix of rows that share one context.
+    """
+
+    def __init__(self, score_fn, window_ms=2.0, max_batch=64):
+        self.score_fn = score_fn
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+        self._worker_pid = None
+
+    def submit(self, feature_row, context=None, timeout=None):
+        """Queue one feature row and block until score_fn has scored it with context"""
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((np.asarray(feature_row, dtype=np.float64), context, future))
+        return future.result(timeout=timeout)
+
+    def _ensure_worker(self):
+        """Start the batching thread, restarting it in forked worker processes"""
+        if self._worker is not None and self._worker_pid == os.getpid() and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is not None and self._worker_pid == os.getpid() and self._worker.is_alive():
+                return
+            if self._worker_pid != os.getpid():
+                # Queued items from the parent process never reach this one
+                self._queue = queue.Queue()
+            self._worker_pid = os.getpid()
+            self._worker = threading.Thread(target=self._run, name='prediction-coalescer', daemon=True)
+            self._worker.start()
+
+    def _collect_batch(self):
+        """Block for the first request, then gather more until the window closes"""
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            # One model call per context in the batch (normally just one)
+            groups = {}
+            for row, context, future in self._collect_batch():
+                rows, futures = groups.setdefault(id(context), (context, [], []))[1:]
+                rows.append(row)
+                futures.append(future)
+            for context, rows, futures in groups.values():
+                try:
+                    scores = self.score_fn(np.vstack(rows), context)
+                except Exception as e:
+                    for future in futures:
+                        future.set_exception(e)
+                    continue
+                for future, score in zip(futures, scores):
+                    future.set_result(score)
@@ -0,0 +1,135 @@
+"""
+Columnar on-disk format for training datasets
+A dataset is a directory (name.cols) holding one .npy file per column plus a
+columns.json manifest with the row count and column order. Columns keep
+compact dtypes (int8 codes, float32 scales) and are opened memory-mapped, so
+loading reads no text and touches only the projected columns' pages.
+Training code reads either format through read_table().
+"""
+
+import json
+import os
+import shutil
+import sys
+
+import numpy as np
+import pandas as pd
+
+FORMAT_VERSION = 1
+SUFFIX = '.cols'
+MANIFEST = 'columns.json'
+
+
+def compact_dtype(values):
+    """Smallest integer dtype holding values' range; float32 for floats"""
+    values = np.asarray(values)
+    if values.dtype.kind in 'iub':
+        if values.size == 0:
+            return np.dtype(np.int8)
+        low, high = values.min(), values.max()
+        for dtype in (np.int8, np.int16, np.int32):
+            info = np.iinfo(dtype)
+            if info.min <= low and high <= info.max:
+                return np.dtype(dtype)
+        return np.dtype(np.int64)
+    if values.dtype.kind == 'f':
+        return np.dtype(np.float32)
+    return values.dtype
+
+
+def is_columnar(path):
+    return os.path.isfile(os.path.join(path, MANIFEST))
+
+
+def _column_path(path, name):
+    return os.path.join(path, f"{name}.npy")
+
+
+def read_manifest(path):
+    with open(os.path.join(path, MANIFEST)) as f:
+        return json.load(f)
+
+
+def allocate_dataset(path, dtypes, n_rows):
+    """Create a dataset of n_rows with preallocated columns, filled in with write_rows
+
+    dtypes maps column names, in order, to their stored dtype.
+    """
+    os.makedirs(path, exist_ok=True)
+    columns = []
+    for name, dtype in dtypes.items():
+        dtype = np.dtype(dtype)
+        np.lib.format.open_memmap(_column_path(path, name), mode='w+', dtype=dtype, shape=(n_rows,)).flush()
+        columns.append({'name': name, 'dtype': dtype.str})
+    with open(os.path.join(path, MANIFEST), 'w') as f:
+        json.dump({'format_version': FORMAT_VERSION, 'rows': n_rows, 'columns': columns}, f, indent=2)
+    return path
+
+
+def write_rows(path, offset, data):
+    """Write data (DataFrame or dict of arrays) into rows [offset, offset + len(data)) of every column
+
+    Independent row ranges can be written from different processes.
+    """
+    for column in read_manifest(path)['columns']:
+        values = np.asarray(data[column['name']])
+        target = np.load(_column_path(path, column['name']), mmap_mode='r+')
+        if target.dtype.kind in 'iu' and values.size and (
+                values.min() < np.iinfo(target.dtype).min or values.max() > np.iinfo(target.dtype).max):
+            raise ValueError(f"{column['name']}: values outside the range of {target.dtype}")
+        target[offset:offset + len(values)] = values
+        target.flush()
+
+
+def write_dataset(path, data, dtypes=None):
+    """Write a whole DataFrame; dtypes default to compact_dtype of each column"""
+    dtypes = dtypes or {name: compact_dtype(data[name]) for name in data.columns}
+    allocate_dataset(path, dtypes, len(data))
+    write_rows(path, 0, data)
+    return path
+
+
+def publish_dataset(tmp_path, path):
+    """Move a fully written dataset into place, replacing any dataset already there"""
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    os.rename(tmp_path, path)
+
+
+def read_columns(path, columns=None):
+    """{name: read-only memory-mapped array} for the requested columns (all by default)"""
+    names = columns or [column['name'] for column in read_manifest(path)['columns']]
+    return {name: np.load(_column_path(path, name), mmap_mode='r') for name in names}
+
+
+def column_names(path):
+    """Column order of a columnar dataset or the header of a CSV"""
+    if is_columnar(path):
+        return [column['name'] for column in read_manifest(path)['columns']]
+    return pd.read_csv(path, nrows=0).columns.tolist()
+
+
+def read_table(path, columns=None):
+    """DataFrame of the requested columns from a columnar dataset or a CSV
+
+    Columnar data keeps its stored dtypes, and only the projected columns are read.
+    """
+    if is_columnar(path):
+        return pd.DataFrame(read_columns(path, columns), columns=columns or column_names(path))
+    return pd.read_csv(path, usecols=columns)[columns] if columns else pd.read_csv(path)
+
+
+def main():
+    if len(sys.argv) != 3:
+        print("usage: python columnar_dataset.py INPUT.csv OUTPUT.cols")
+        sys.exit(2)
+    source, path = sys.argv[1:]
+    write_dataset(path, pd.read_csv(source))
+    manifest = read_manifest(path)
+    print(f"Wrote {manifest['rows']} rows to {path}")
+    for column in manifest['columns']:
+        print(f"  {column['name']:<24}{np.dtype(column['dtype']).name}")
+
+
+if __name__ == '__main__':
+    main()
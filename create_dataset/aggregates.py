@@ -0,0 +1,103 @@
+"""
+Streaming dashboard statistics
+Welford mean/variance and fixed-bin histogram counts for predicted scores,
+overall and per gender/major, updated one submission at a time
+"""
+
+import json
+import math
+
+HIST_BINS = 10
+HIST_RANGE = (0.0, 100.0)
+GROUP_COLUMNS = ['gender', 'major']
+
+
+def _welford_update(state, value):
+    """Fold one value into a {'count', 'mean', 'm2'} accumulator"""
+    state['count'] += 1
+    delta = value - state['mean']
+    state['mean'] += delta / state['count']
+    state['m2'] += delta * (value - state['mean'])
+
+
+def _std(state):
+    # Sample standard deviation, matching pandas .std()
+    if state['count'] < 2:
+        return float('nan')
+    return math.sqrt(state['m2'] / (state['count'] - 1))
+
+
+def _group_key(value):
+    """Stable dict key for a categorical code such as 1.0 or '1'"""
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    if math.isnan(number):
+        return None
+    return str(int(number)) if number.is_integer() else str(number)
+
+
+class DashboardAggregates:
+    """Incrementally maintained statistics over every logged prediction"""
+
+    def __init__(self, state=None):
+        self.state = state or {
+            'overall': {'count': 0, 'mean': 0.0, 'm2': 0.0},
+            'hist_counts': [0] * HIST_BINS,
+            'groups': {column: {} for column in GROUP_COLUMNS}
+        }
+
+    @classmethod
+    def from_json(cls, text):
+        return cls(json.loads(text)) if text else cls()
+
+    def to_json(self):
+        return json.dumps(self.state, separators=(',', ':'))
+
+    def update(self, record):
+        """Add one submission; records without a numeric prediction are ignored"""
+        try:
+            score = float(record.get('predicted_mental_health'))
+        except (TypeError, ValueError):
+            return
+        if math.isnan(score):
+            return
+
+        _welford_update(self.state['overall'], score)
+
+        # Same binning as np.histogram(bins=10, range=(0, 100)): last bin includes 100
+        low, high = HIST_RANGE
+        if low <= score <= high:
+            index = min(int((score - low) / (high - low) * HIST_BINS), HIST_BINS - 1)
+            self.state['hist_counts'][index] += 1
+
+        for column in GROUP_COLUMNS:
+            key = _group_key(record.get(column))
+            if key is None:
+                continue
+            groups = self.state['groups'].setdefault(column, {})
+            _welford_update(groups.setdefault(key, {'count': 0, 'mean': 0.0, 'm2': 0.0}), score)
+
+    def summary(self):
+        """Statistics in the shape the dashboard template expects"""
+        overall = self.state['overall']
+        if not overall['count']:
+            return {'pred_mean': 0, 'pred_std': 0, 'hist_bins': [], 'hist_counts': [], 'groups': {}}
+
+        low, high = HIST_RANGE
+        width = (high - low) / HIST_BINS
+        return {
+            'count': overall['count'],
+            'pred_mean': overall['mean'],
+            'pred_std': _std(overall),
+            'hist_bins': [low + i * width for i in range(HIST_BINS + 1)],
+            'hist_counts': list(self.state['hist_counts']),
+            'groups': {
+                column: {
+                    key: {'count': group['count'], 'mean': group['mean'], 'std': _std(group)}
+                    for key, group in sorted(groups.items())
+                }
+                for column, groups in self.state['groups'].items()
+            }
+        }
@@ -1,32 +1,37 @@
 from flask import Flask, render_template, request, jsonify, redirect, url_for
-import joblib
-import pandas as pd
-import numpy as np
 import os
+import sys
 from datetime import datetime
+from storage import open_store
+
+# The model bundle format is shared with the main app at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from model_bundle import load_bundle
+from feature_schema import DATASET_FIELDS, CompiledSchema, SchemaError
 
 app = Flask(__name__)
 
-# Path to saved model (joblib dict with keys: 'model' and 'features')
-MODEL_PATH = os.path.join(os.path.dirname(__file__), 'models', 'xgb_mental_health_model.pkl')
-DATA_LOG = os.path.join(os.path.dirname(__file__), 'data', 'submissions.csv')
+# Path to saved model bundle (UBJSON model + feature order, see train_model.py)
+MODEL_PATH = os.path.join(os.path.dirname(__file__), 'models', 'xgb_mental_health_model.bundle')
+# Directory holding the submissions log (SUBMISSIONS_DIR overrides it, e.g. for benchmarks)
+DATA_DIR = os.environ.get('SUBMISSIONS_DIR', os.path.join(os.path.dirname(__file__), 'data'))
+# 'sqlite' (default, indexed and safe with several workers) or 'csv' (legacy log)
+SUBMISSIONS_BACKEND = os.environ.get('SUBMISSIONS_BACKEND', 'sqlite').lower()
 
 # Load model once
-model_pkg = None
 model = None
 feature_cols = None
 if os.path.exists(MODEL_PATH):
-    model_pkg = joblib.load(MODEL_PATH)
-    model = model_pkg.get('model') if isinstance(model_pkg, dict) else model_pkg
-    feature_cols = model_pkg.get('features') if isinstance(model_pkg, dict) else None
+    model_bundle = load_bundle(MODEL_PATH)
+    model = model_bundle.load_regressor()
+    feature_cols = model_bundle.feature_names
+    # Form decoder for the synthetic dataset's encoding, in the model's feature order
+    form_schema = CompiledSchema(DATASET_FIELDS, feature_cols)
 else:
     print("WARNING: Model file not found at", MODEL_PATH)
 
-# Ensure data folder and file
-os.makedirs(os.path.dirname(DATA_LOG), exist_ok=True)
-if not os.path.exists(DATA_LOG):
-    # create CSV with headers
-    pd.DataFrame(columns=(feature_cols if feature_cols else []) + ['mental_health_condition','predicted_mental_health','timestamp']).to_csv(DATA_LOG, index=False)
+# Open the submissions store (imports new rows of an existing submissions.csv into SQLite)
+store = open_store(SUBMISSIONS_BACKEND, DATA_DIR, feature_cols)
 
 @app.route('/')
 def index():
@@ -39,33 +44,11 @@ def predict():
     if model is None or feature_cols is None:
         return jsonify({'error': 'Model not loaded on server.'}), 500
 
-    # Extract form data
-    data = {}
-    for f in feature_cols:
-        val = request.form.get(f)
-        if val is None:
-            # attempt common alternate names
-            val = request.form.get(f.lower())
-        data[f] = val
-
-    # Convert to numeric types where appropriate
-    X = pd.DataFrame([data])
-    # Coerce numeric columns
-    for col in X.columns:
-        # try convert to numeric, if fails keep as is
-        try:
-            X[col] = pd.to_numeric(X[col], errors='coerce')
-        except Exception:
-            pass
-    # Fill na with median or 0
-    for col in X.columns:
-        if X[col].dtype in [np.float64, np.int64]:
-            X[col] = X[col].fillna(X[col].median())
-        else:
-            X[col] = X[col].fillna(0)
-
-    # Reorder columns to model's feature order
-    X = X[feature_cols]
+    # Decode the form into a float32 row in the model's feature order; blanks stay missing (NaN)
+    try:
+        X = form_schema.decode(request.form)
+    except SchemaError as e:
+        return jsonify({'error': str(e), 'field': e.field}), 400
 
     # Prediction
     pred = model.predict(X)[0]
@@ -77,7 +60,7 @@ def predict():
     pred_val = max(1.0, min(100.0, pred_val))
 
     # Save submission
-    out = X.copy()
+    out = form_schema.to_record(X[0])
     out['predicted_mental_health'] = round(pred_val,2)
     out['timestamp'] = datetime.utcnow().isoformat()
 
@@ -91,35 +74,20 @@ def predict():
     else:
         out['mental_health_condition'] = ''
 
-    # Append to CSV
-    out.to_csv(DATA_LOG, mode='a', header=False, index=False)
+    # Append to the submissions store
+    store.append(out)
 
     # Redirect to dashboard for this latest entry (show recent)
     return redirect(url_for('dashboard'))
 
 @app.route('/dashboard')
 def dashboard():
-    # Read submissions and show last 50
-    df = pd.read_csv(DATA_LOG)
-    recent = df.tail(50).iloc[::-1]  # reverse for newest first
-
-    # Compute some aggregate stats for charts
-    # Example: distribution of predicted scores, average by gender
-    stats = {}
-    if 'predicted_mental_health' in df.columns:
-        stats['pred_mean'] = float(df['predicted_mental_health'].dropna().astype(float).mean())
-        stats['pred_std'] = float(df['predicted_mental_health'].dropna().astype(float).std())
-        hist_vals = np.histogram(df['predicted_mental_health'].dropna().astype(float), bins=10, range=(0,100))
-        stats['hist_bins'] = hist_vals[1].tolist()
-        stats['hist_counts'] = hist_vals[0].tolist()
-    else:
-        stats['pred_mean'] = 0
-        stats['pred_std'] = 0
-        stats['hist_bins'] = []
-        stats['hist_counts'] = []
+    # Last 50 submissions, newest first (an indexed range read with SQLite)
+    records = store.recent(50)
+
+    # Aggregate stats for charts, maintained incrementally on every write
+    stats = store.aggregates().summary()
 
-    # Convert recent table to records for the template
-    records = recent.to_dict(orient='records')
     return render_template('dashboard.html', records=records, stats=stats, feature_cols=feature_cols)
 
 if __name__ == '__main__':
@@ -1,68 +1,226 @@
+import argparse
+import os
+import shutil
+import sys
+from collections import deque
+from multiprocessing import Pool
+
 import numpy as np
 import pandas as pd
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from columnar_dataset import allocate_dataset, publish_dataset, read_columns, write_dataset, write_rows
+
 N = 1000000
-np.random.seed(42)
-
-# Generate demographic and categorical features
-age = np.clip(np.random.normal(20, 2.5, N).astype(int), 17, 30)
-academic_year = np.random.choice([1,2,3,4], size=N, p=[0.3,0.25,0.2,0.25])
-gender = np.random.choice([0,1,2], size=N, p=[0.48,0.48,0.04])  # 0=Male,1=Female,2=Other
-major = np.random.choice([0,1,2,3], size=N, p=[0.35,0.25,0.20,0.20])  # 0=STEM,1=Arts,2=Business,3=Other
-residential = np.random.choice([0,1,2], size=N, p=[0.4,0.3,0.3])  # 0=Urban,1=Suburban,2=Rural
-family_history = np.random.choice([0,1], size=N, p=[0.85,0.15])
-treatment_history = np.random.choice([0,1], size=N, p=[0.90,0.10])
-
-# Numeric stress/wellness scales (1–10 or hours):
-academic_pressure = np.clip(np.random.normal(5.5, 2, N), 1, 10)
-social_connectedness = np.clip(np.random.normal(6, 2, N), 1, 10)
-coping_mechanisms = np.clip(np.random.normal(5.5, 2, N), 1, 10)
-financial_stress = np.clip(np.random.normal(6, 2, N), 1, 10)
-dietary_habits = np.clip(np.random.normal(6, 2, N), 1, 10)
-sleep_duration = np.clip(np.random.normal(7, 1.5, N), 4, 10)  # hours/night
-physical_activity = np.clip(np.random.normal(4, 2, N), 0, 12)  # hours/week
-screen_time = np.clip(np.random.normal(5, 2, N), 0.5, 12)     # hours/day
-cgpa = np.clip(np.random.normal(7, 1.2, N), 4, 10)
-
-# Compute mental_health_condition (1–100) based on factors
-# Baseline = 40, then adjust by weighted factors:
-mental_health = (
-    40
-    - 2*academic_pressure
-    + 1.5*social_connectedness
-    + 1.5*coping_mechanisms
-    - 2*financial_stress
-    + 1*physical_activity
-    + 1*dietary_habits
-    + 3*sleep_duration
-    - 0.5*screen_time
-    - 5*family_history
-    - 5*treatment_history
-)
-# Add some noise and clip to [1,100]
-mental_health = mental_health + np.random.normal(0, 8, N)
-mental_health = np.clip(mental_health, 1, 100).round().astype(int)
-
-# Assemble into DataFrame
-df = pd.DataFrame({
-    "age": age,
-    "academic_year": academic_year,
-    "gender": gender,
-    "major": major,
-    "residential_status": residential,
-    "family_history": family_history,
-    "treatment_history": treatment_history,
-    "academic_pressure": np.round(academic_pressure,1),
-    "social_connectedness": np.round(social_connectedness,1),
-    "coping_mechanisms": np.round(coping_mechanisms,1),
-    "financial_stress": np.round(financial_stress,1),
-    "dietary_habits": np.round(dietary_habits,1),
-    "sleep_duration": np.round(sleep_duration,1),
-    "physical_activity": np.round(physical_activity,1),
-    "screen_time": np.round(screen_time,1),
-    "cgpa": np.round(cgpa,1),
-    "mental_health_condition": mental_health
-})
-print(df.head(5))
-
-df.to_csv("student_mental_health_synthetic.csv", index=False)
+CHUNK_SIZE = 100000
+SEED = 42
+OUTPUT = "student_mental_health_synthetic.csv"
+OUTPUT_COLUMNAR = "student_mental_health_synthetic.cols"
+
+# Stored dtypes for --format columnar: codes, ages and the 1-100 target fit
+# int8, and float32 holds the one-decimal scales
+COLUMN_DTYPES = {
+    "age": np.int8,
+    "academic_year": np.int8,
+    "gender": np.int8,
+    "major": np.int8,
+    "residential_status": np.int8,
+    "family_history": np.int8,
+    "treatment_history": np.int8,
+    "academic_pressure": np.float32,
+    "social_connectedness": np.float32,
+    "coping_mechanisms": np.float32,
+    "financial_stress": np.float32,
+    "dietary_habits": np.float32,
+    "sleep_duration": np.float32,
+    "physical_activity": np.float32,
+    "screen_time": np.float32,
+    "cgpa": np.float32,
+    "mental_health_condition": np.int8
+}
+
+
+def generate_chunk(n, seed_seq):
+    """Generate n rows from an independent random stream"""
+    rng = np.random.default_rng(seed_seq)
+
+    # Generate demographic and categorical features
+    age = np.clip(rng.normal(20, 2.5, n).astype(int), 17, 30)
+    academic_year = rng.choice([1,2,3,4], size=n, p=[0.3,0.25,0.2,0.25])
+    gender = rng.choice([0,1,2], size=n, p=[0.48,0.48,0.04])  # 0=Male,1=Female,2=Other
+    major = rng.choice([0,1,2,3], size=n, p=[0.35,0.25,0.20,0.20])  # 0=STEM,1=Arts,2=Business,3=Other
+    residential = rng.choice([0,1,2], size=n, p=[0.4,0.3,0.3])  # 0=Urban,1=Suburban,2=Rural
+    family_history = rng.choice([0,1], size=n, p=[0.85,0.15])
+    treatment_history = rng.choice([0,1], size=n, p=[0.90,0.10])
+
+    # Numeric stress/wellness scales (1–10 or hours):
+    academic_pressure = np.clip(rng.normal(5.5, 2, n), 1, 10)
+    social_connectedness = np.clip(rng.normal(6, 2, n), 1, 10)
+    coping_mechanisms = np.clip(rng.normal(5.5, 2, n), 1, 10)
+    financial_stress = np.clip(rng.normal(6, 2, n), 1, 10)
+    dietary_habits = np.clip(rng.normal(6, 2, n), 1, 10)
+    sleep_duration = np.clip(rng.normal(7, 1.5, n), 4, 10)  # hours/night
+    physical_activity = np.clip(rng.normal(4, 2, n), 0, 12)  # hours/week
+    screen_time = np.clip(rng.normal(5, 2, n), 0.5, 12)     # hours/day
+    cgpa = np.clip(rng.normal(7, 1.2, n), 4, 10)
+
+    # Compute mental_health_condition (1–100) based on factors
+    # Baseline = 40, then adjust by weighted factors:
+    mental_health = (
+        40
+        - 2*academic_pressure
+        + 1.5*social_connectedness
+        + 1.5*coping_mechanisms
+        - 2*financial_stress
+        + 1*physical_activity
+        + 1*dietary_habits
+        + 3*sleep_duration
+        - 0.5*screen_time
+        - 5*family_history
+        - 5*treatment_history
+    )
+    # Add some noise and clip to [1,100]
+    mental_health = mental_health + rng.normal(0, 8, n)
+    mental_health = np.clip(mental_health, 1, 100).round().astype(int)
+
+    # Assemble into DataFrame
+    return pd.DataFrame({
+        "age": age,
+        "academic_year": academic_year,
+        "gender": gender,
+        "major": major,
+        "residential_status": residential,
+        "family_history": family_history,
+        "treatment_history": treatment_history,
+        "academic_pressure": np.round(academic_pressure,1),
+        "social_connectedness": np.round(social_connectedness,1),
+        "coping_mechanisms": np.round(coping_mechanisms,1),
+        "financial_stress": np.round(financial_stress,1),
+        "dietary_habits": np.round(dietary_habits,1),
+        "sleep_duration": np.round(sleep_duration,1),
+        "physical_activity": np.round(physical_activity,1),
+        "screen_time": np.round(screen_time,1),
+        "cgpa": np.round(cgpa,1),
+        "mental_health_condition": mental_health
+    })
+
+
+def _chunk_to_csv(task):
+    """Worker: build one chunk and serialize it, so only text crosses processes"""
+    index, n, seed_seq = task
+    return generate_chunk(n, seed_seq).to_csv(index=False, header=(index == 0))
+
+
+def _chunk_to_rows(task):
+    """Worker: build one chunk and write it straight into its rows of the columnar dataset"""
+    index, n, seed_seq, path, offset = task
+    write_rows(path, offset, generate_chunk(n, seed_seq))
+    return n
+
+
+def _chunk_to_file(task):
+    """Worker: build one chunk and write it as its own part file"""
+    index, n, seed_seq, output_dir, fmt = task
+    if fmt == "columnar":
+        path = os.path.join(output_dir, f"part-{index:05d}.cols")
+        write_dataset(path, generate_chunk(n, seed_seq), COLUMN_DTYPES)
+    else:
+        path = os.path.join(output_dir, f"part-{index:05d}.csv")
+        generate_chunk(n, seed_seq).to_csv(path, index=False)
+    return path
+
+
+def chunk_tasks(n_rows, chunk_size, seed):
+    """(index, size, SeedSequence) per chunk; seeds depend only on the master seed and chunk index"""
+    n_chunks = -(-n_rows // chunk_size)
+    seeds = np.random.SeedSequence(seed).spawn(n_chunks)
+    return [(i, min(chunk_size, n_rows - i * chunk_size), seeds[i]) for i in range(n_chunks)]
+
+
+def generate_dataset(n_rows=N, output=OUTPUT, chunk_size=CHUNK_SIZE, workers=None, seed=SEED):
+    """Stream the dataset to CSV in chunk order, keeping at most 2 chunks per worker in flight"""
+    tasks = chunk_tasks(n_rows, chunk_size, seed)
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = 2 * workers
+
+    with Pool(workers) as pool, open(output, "w", newline="") as f:
+        pending = deque()
+        task_iter = iter(tasks)
+        for task in task_iter:
+            pending.append(pool.apply_async(_chunk_to_csv, (task,)))
+            if len(pending) >= max_in_flight:
+                break
+        while pending:
+            # Write in submission order so output does not depend on scheduling
+            f.write(pending.popleft().get())
+            next_task = next(task_iter, None)
+            if next_task is not None:
+                pending.append(pool.apply_async(_chunk_to_csv, (next_task,)))
+
+    return len(tasks)
+
+
+def generate_columnar_dataset(n_rows=N, output=OUTPUT_COLUMNAR, chunk_size=CHUNK_SIZE, workers=None, seed=SEED):
+    """Write the dataset in the columnar format (same rows as the CSV)
+
+    Columns are preallocated and each worker writes its chunk's row range in
+    place, so chunks can finish in any order and nothing is sent back to the parent.
+    """
+    tasks = chunk_tasks(n_rows, chunk_size, seed)
+    # Built beside the target and moved into place once complete
+    tmp_path = f"{output}.tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    allocate_dataset(tmp_path, COLUMN_DTYPES, n_rows)
+    row_tasks = [(index, n, seed_seq, tmp_path, index * chunk_size) for index, n, seed_seq in tasks]
+    with Pool(workers or os.cpu_count() or 1) as pool:
+        for _ in pool.imap_unordered(_chunk_to_rows, row_tasks):
+            pass
+    publish_dataset(tmp_path, output)
+    return len(tasks)
+
+
+def write_chunk_files(n_rows=N, output_dir="chunks", chunk_size=CHUNK_SIZE, workers=None, seed=SEED, fmt="csv"):
+    """Write the same chunks as separate part files (input for out-of-core training)"""
+    os.makedirs(output_dir, exist_ok=True)
+    tasks = [task + (output_dir, fmt) for task in chunk_tasks(n_rows, chunk_size, seed)]
+    with Pool(workers or os.cpu_count() or 1) as pool:
+        for _ in pool.imap_unordered(_chunk_to_file, tasks):
+            pass
+    return len(tasks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate the synthetic student mental health dataset")
+    parser.add_argument("--rows", type=int, default=N, help="number of rows to generate")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE,
+                        help="rows per chunk; peak memory scales with this, not --rows")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--seed", type=int, default=SEED,
+                        help="master seed; output is identical for any worker count")
+    parser.add_argument("--format", choices=["csv", "columnar"], default="csv",
+                        help="columnar writes one memory-mappable .npy per column with compact dtypes")
+    parser.add_argument("--output", default=None,
+                        help=f"default: {OUTPUT}, or {OUTPUT_COLUMNAR} with --format columnar")
+    parser.add_argument("--output-dir", default=None,
+                        help="write one part file per chunk into this directory instead of a single dataset")
+    args = parser.parse_args()
+
+    if args.output_dir:
+        n_chunks = write_chunk_files(args.rows, args.output_dir, args.chunk_size, args.workers, args.seed,
+                                     args.format)
+        print(f"Wrote {args.rows} rows in {n_chunks} part files to {args.output_dir}")
+        return
+
+    if args.format == "columnar":
+        output = args.output or OUTPUT_COLUMNAR
+        n_chunks = generate_columnar_dataset(args.rows, output, args.chunk_size, args.workers, args.seed)
+        print(pd.DataFrame({name: column[:5] for name, column in read_columns(output).items()}))
+    else:
+        output = args.output or OUTPUT
+        n_chunks = generate_dataset(args.rows, output, args.chunk_size, args.workers, args.seed)
+        print(pd.read_csv(output, nrows=5))
+    print(f"Wrote {args.rows} rows in {n_chunks} chunks to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+"""
+Pluggable storage for questionnaire submissions
+SQLite (WAL mode, timestamp index) is the default; the original CSV log is
+kept as a backend and is imported into SQLite on start. Both backends keep
+dashboard aggregates up to date on every write and persist them next to
+the log.
+"""
+
+import csv
+import fcntl
+import hashlib
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from datetime import datetime
+
+from aggregates import DashboardAggregates
+
+# Columns logged alongside the model features
+RESULT_COLUMNS = ['mental_health_condition', 'predicted_mental_health', 'timestamp']
+
+
+def _to_float(value):
+    """Parse a logged value as float, returning None for blanks and junk"""
+    if value is None or value == '':
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _is_timestamp(value):
+    try:
+        datetime.fromisoformat(value)
+        return True
+    except (TypeError, ValueError):
+        return False
+
+
+def _file_digest(path):
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+
+class SubmissionStore(ABC):
+    """Interface shared by the submission backends"""
+
+    def __init__(self, feature_cols):
+        self.feature_cols = list(feature_cols or [])
+        self.columns = self.feature_cols + RESULT_COLUMNS
+
+    @abstractmethod
+    def append(self, record):
+        """Persist one submission (dict keyed by column name)"""
+
+    @abstractmethod
+    def recent(self, limit=50):
+        """Return the newest `limit` submissions, newest first"""
+
+    @abstractmethod
+    def aggregates(self):
+        """Return the incrementally maintained DashboardAggregates"""
+
+
+class CSVSubmissionStore(SubmissionStore):
+    """Append-only CSV log (the original format); reads scan the whole file
+
+    Several worker processes can share one log: every append takes an
+    exclusive flock, writes the row and updates the aggregates sidecar from
+    its current contents on disk, so no worker overwrites another's counts.
+    """
+
+    def __init__(self, path, feature_cols):
+        super().__init__(feature_cols)
+        self.path = path
+        self.aggregates_path = os.path.splitext(path)[0] + '_aggregates.json'
+        self.lock_path = path + '.lock'
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._file_lock():
+            if not os.path.exists(path):
+                with open(path, 'w', newline='') as f:
+                    csv.writer(f).writerow(self.columns)
+            if not os.path.exists(self.aggregates_path):
+                # First start with an existing log: scan it once
+                aggregates = DashboardAggregates()
+                for row in self.rows():
+                    aggregates.update(row)
+                self._save_aggregates(aggregates)
+
+    @contextmanager
+    def _file_lock(self):
+        """Exclusive lock shared by every process (and thread) using this log"""
+        with open(self.lock_path, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _load_aggregates(self):
+        with open(self.aggregates_path) as f:
+            return DashboardAggregates.from_json(f.read())
+
+    def _save_aggregates(self, aggregates):
+        # Written beside the sidecar and renamed over it, so readers never see half a file
+        tmp_path = f"{self.aggregates_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(aggregates.to_json())
+        os.replace(tmp_path, self.aggregates_path)
+
+    def append(self, record):
+        with self._file_lock():
+            with open(self.path, 'a', newline='') as f:
+                csv.DictWriter(f, fieldnames=self.columns, extrasaction='ignore').writerow(record)
+            aggregates = self._load_aggregates()
+            aggregates.update(record)
+            self._save_aggregates(aggregates)
+
+    def rows(self):
+        """Yield every logged submission as a dict"""
+        with open(self.path, newline='') as f:
+            yield from csv.DictReader(f)
+
+    def recent(self, limit=50):
+        rows = list(self.rows())
+        return rows[-limit:][::-1]
+
+    def aggregates(self):
+        # The sidecar is replaced atomically, so reads need no lock
+        return self._load_aggregates()
+
+
+class SQLiteSubmissionStore(SubmissionStore):
+    """SQLite log in WAL mode so several gunicorn workers can write concurrently"""
+
+    def __init__(self, path, feature_cols):
+        super().__init__(feature_cols)
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        conn = self._connection()
+        feature_defs = ''.join(f', {self._quote(col)} REAL' for col in self.feature_cols)
+        with conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS submissions ('
+                'id INTEGER PRIMARY KEY AUTOINCREMENT'
+                f'{feature_defs}, '
+                'mental_health_condition REAL, '
+                'predicted_mental_health REAL, '
+                'timestamp TEXT NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_submissions_timestamp ON submissions (timestamp)')
+            conn.execute('CREATE TABLE IF NOT EXISTS aggregates (name TEXT PRIMARY KEY, state TEXT NOT NULL)')
+            # CSV logs already imported, by content hash
+            conn.execute('CREATE TABLE IF NOT EXISTS csv_imports ('
+                         'sha256 TEXT PRIMARY KEY, path TEXT, rows INTEGER, imported_at TEXT)')
+
+        # Columns present in an existing database (features may change between models)
+        self._stored = [row[1] for row in conn.execute('PRAGMA table_info(submissions)') if row[1] != 'id']
+        self._insert_sql = 'INSERT INTO submissions ({}) VALUES ({})'.format(
+            ', '.join(self._quote(col) for col in self._stored), ', '.join('?' for _ in self._stored)
+        )
+
+        # Databases created before aggregates existed are scanned once
+        with self._write_transaction() as conn:
+            if conn.execute("SELECT 1 FROM aggregates WHERE name = 'dashboard'").fetchone() is None:
+                aggregates = DashboardAggregates()
+                for row in conn.execute('SELECT * FROM submissions'):
+                    aggregates.update(dict(row))
+                self._save_aggregates(conn, aggregates)
+
+    @staticmethod
+    def _quote(name):
+        return '"' + name.replace('"', '""') + '"'
+
+    def _connection(self):
+        """One connection per thread and per process (connections don't survive fork)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            # Autocommit mode; writes open explicit IMMEDIATE transactions
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @contextmanager
+    def _write_transaction(self):
+        """Take the write lock up front so concurrent workers serialize aggregate updates"""
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    @staticmethod
+    def _load_aggregates(conn):
+        row = conn.execute("SELECT state FROM aggregates WHERE name = 'dashboard'").fetchone()
+        return DashboardAggregates.from_json(row[0] if row else None)
+
+    @staticmethod
+    def _save_aggregates(conn, aggregates):
+        conn.execute(
+            "INSERT OR REPLACE INTO aggregates (name, state) VALUES ('dashboard', ?)", (aggregates.to_json(),)
+        )
+
+    def _values(self, record):
+        return [record.get(col) if col == 'timestamp' else _to_float(record.get(col)) for col in self._stored]
+
+    def append(self, record):
+        self.append_many([record])
+
+    def append_many(self, records):
+        # Row inserts and the aggregate update commit atomically
+        with self._write_transaction() as conn:
+            aggregates = self._load_aggregates(conn)
+            for record in records:
+                conn.execute(self._insert_sql, self._values(record))
+                aggregates.update(record)
+            self._save_aggregates(conn, aggregates)
+
+    def count(self):
+        return self._connection().execute('SELECT COUNT(*) FROM submissions').fetchone()[0]
+
+    def recent(self, limit=50):
+        # Served by the timestamp index: reads only `limit` rows
+        cursor = self._connection().execute(
+            'SELECT * FROM submissions ORDER BY timestamp DESC, id DESC LIMIT ?', (limit,)
+        )
+        return [dict(row) for row in cursor]
+
+    def aggregates(self):
+        # A single-row read, independent of how many submissions are logged
+        return self._load_aggregates(self._connection())
+
+    def migrate_from_csv(self, csv_path):
+        """Import the legacy CSV log; safe to run on every start and from every worker
+
+        Rows, aggregates and the file's hash commit in one transaction, and rows
+        whose timestamp is already stored are skipped, so an interrupted import
+        is redone on the next start without duplicates. The CSV stays where it
+        is (it is tracked in git) and is not read again while unchanged.
+        Returns the number of rows imported.
+        """
+        # Earlier versions renamed the log to .migrating before importing it; a
+        # crash mid-import left it there, so take it back
+        claimed_path = csv_path + '.migrating'
+        if os.path.exists(claimed_path) and not os.path.exists(csv_path):
+            try:
+                os.rename(claimed_path, csv_path)
+            except FileNotFoundError:
+                pass
+
+        try:
+            digest = _file_digest(csv_path)
+        except FileNotFoundError:
+            return 0
+
+        # The write lock serializes workers starting at the same time
+        with self._write_transaction() as conn:
+            if conn.execute('SELECT 1 FROM csv_imports WHERE sha256 = ?', (digest,)).fetchone():
+                return 0
+
+            aggregates = self._load_aggregates(conn)
+            imported = 0
+            with open(csv_path, newline='') as f:
+                for row in csv.DictReader(f):
+                    # Rows written before the column-order fix carry
+                    # predicted, timestamp, condition under the condition, predicted, timestamp headers
+                    if _is_timestamp(row.get('predicted_mental_health')) and not _is_timestamp(row.get('timestamp')):
+                        row['mental_health_condition'], row['predicted_mental_health'], row['timestamp'] = (
+                            row.get('timestamp'), row.get('mental_health_condition'), row.get('predicted_mental_health')
+                        )
+                    if not row.get('timestamp'):
+                        continue
+                    if conn.execute('SELECT 1 FROM submissions WHERE timestamp = ?', (row['timestamp'],)).fetchone():
+                        continue
+                    conn.execute(self._insert_sql, self._values(row))
+                    aggregates.update(row)
+                    imported += 1
+            self._save_aggregates(conn, aggregates)
+            conn.execute('INSERT INTO csv_imports (sha256, path, rows, imported_at) VALUES (?, ?, ?, ?)',
+                         (digest, csv_path, imported, datetime.now().isoformat()))
+        return imported
+
+
+def open_store(backend, data_dir, feature_cols):
+    """Create the configured submission store, importing a legacy CSV log into SQLite"""
+    csv_path = os.path.join(data_dir, 'submissions.csv')
+    if backend == 'csv':
+        return CSVSubmissionStore(csv_path, feature_cols)
+    if backend != 'sqlite':
+        raise ValueError(f"Unknown submissions backend: {backend}")
+
+    store = SQLiteSubmissionStore(os.path.join(data_dir, 'submissions.db'), feature_cols)
+    imported = store.migrate_from_csv(csv_path)
+    if imported:
+        print(f"Imported {imported} submissions from {csv_path}")
+    return store
@@ -1,11 +1,17 @@
-import joblib
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from model_bundle import load_bundle
 
 # =====================
 # 8. Demonstrate Loading & Prediction
 # =====================
-saved = joblib.load("xgb_mental_health_model.pkl")
-loaded_model = saved["model"]
-feature_order = saved["features"]
+saved = load_bundle(os.path.join("models", "xgb_mental_health_model.bundle"))
+loaded_model = saved.load_regressor()
+feature_order = saved.feature_names
 
 # Example prediction
 new_data = pd.DataFrame([{
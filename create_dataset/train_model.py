@@ -1,100 +1,270 @@
 # train_xgboost.py
+import argparse
+import glob
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
 import pandas as pd
 import numpy as np
-import joblib
 import json
-from sklearn.model_selection import train_test_split, GridSearchCV
+import xgboost as xgb
+from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_squared_error, r2_score
 from xgboost import XGBRegressor
-import matplotlib.pyplot as plt
-
-# =====================
-# 1. Load Dataset
-# =====================
-df = pd.read_csv("student_mental_health_synthetic.csv")
-
-X = df.drop(columns=["mental_health_condition"])
-y = df["mental_health_condition"]
-
-# =====================
-# 2. Train/Test Split
-# =====================
-X_train, X_test, y_train, y_test = train_test_split(
-    X, y, test_size=0.2, random_state=42
-)
-
-# =====================
-# 3. Baseline Model
-# =====================
-print("\n===== BASELINE MODEL =====")
-baseline = XGBRegressor(objective="reg:squarederror", random_state=42, n_jobs=-1)
-baseline.fit(X_train, y_train)
-y_pred_baseline = baseline.predict(X_test)
-baseline_rmse = np.sqrt(mean_squared_error(y_test, y_pred_baseline))
-baseline_r2 = r2_score(y_test, y_pred_baseline)
-print(f"Baseline RMSE: {baseline_rmse:.3f}")
-print(f"Baseline R²:   {baseline_r2:.3f}")
-
-# =====================
-# 4. Hyperparameter Tuning
-# =====================
-print("\n===== HYPERPARAMETER TUNING =====")
-param_grid = {
-    "n_estimators": [200, 400],
-    "max_depth": [4, 6],
-    "learning_rate": [0.05, 0.1],
-    "subsample": [0.8, 1.0],
-    "colsample_bytree": [0.8, 1.0]
+
+# Shared training helpers live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from hyperparameter_search import successive_halving_search
+from training_scheduler import available_cpus, scheduled_grid_search
+from model_bundle import write_bundle
+from columnar_dataset import column_names, read_table
+
+DATA_PATH = "student_mental_health_synthetic.csv"
+MODEL_PATH = os.path.join("models", "xgb_mental_health_model.bundle")
+TARGET = "mental_health_condition"
+
+# Best grid-search result, used when training without tuning (e.g. out-of-core)
+DEFAULT_PARAMS = {
+    "n_estimators": 400,
+    "max_depth": 4,
+    "learning_rate": 0.05,
+    "subsample": 0.8,
+    "colsample_bytree": 0.8
 }
 
-grid_search = GridSearchCV(
-    estimator=XGBRegressor(objective="reg:squarederror", random_state=42, n_jobs=-1),
-    param_grid=param_grid,
-    scoring="neg_root_mean_squared_error",
-    cv=3,
-    verbose=2
-)
-
-grid_search.fit(X_train, y_train)
-best_model = grid_search.best_estimator_
-
-print(f"Best Params: {grid_search.best_params_}")
-print(f"Best CV RMSE: {-grid_search.best_score_:.3f}")
-
-# =====================
-# 5. Final Model Evaluation
-# =====================
-y_pred_final = best_model.predict(X_test)
-final_rmse = np.sqrt(mean_squared_error(y_test, y_pred_final))
-final_r2 = r2_score(y_test, y_pred_final)
-
-print("\n===== FINAL MODEL =====")
-print(f"Final RMSE: {final_rmse:.3f}")
-print(f"Final R²:   {final_r2:.3f}")
-
-# =====================
-# 6. Feature Importance
-# =====================
-importances = best_model.feature_importances_
-sorted_idx = np.argsort(importances)[::-1]
-plt.figure(figsize=(10, 6))
-plt.bar(range(len(importances)), importances[sorted_idx])
-plt.xticks(range(len(importances)), X.columns[sorted_idx], rotation=45, ha="right")
-plt.title("Feature Importances (XGBoost)")
-plt.tight_layout()
-plt.savefig("feature_importances.png")
-plt.close()
-print("✅ Feature importance plot saved as feature_importances.png")
-
-# =====================
-# 7. Save Model + Metrics
-# =====================
-joblib.dump({"model": best_model, "features": X.columns.tolist()}, "xgb_mental_health_model.pkl")
-metrics = {"baseline_rmse": float(baseline_rmse), "baseline_r2": float(baseline_r2),
-           "final_rmse": float(final_rmse), "final_r2": float(final_r2),
-           "best_params": grid_search.best_params_}
-with open("xgb_model_metrics.json", "w") as f:
-    json.dump(metrics, f, indent=4)
-
-print("✅ Model saved as xgb_mental_health_model.pkl")
-print("✅ Metrics saved as xgb_model_metrics.json")
\ No newline at end of file
+
+def peak_rss_mb():
+    """Peak resident memory of this process so far (ru_maxrss is KB on Linux)"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def train_in_memory(data_path=DATA_PATH, search="grid", budget_seconds=None):
+    """Original pipeline: load the whole dataset (CSV or columnar), baseline, tune, evaluate
+
+    search is "grid" (CV grid search), "halving" (budgeted successive halving
+    with early stopping) or "none" (fit DEFAULT_PARAMS).
+    """
+    # =====================
+    # 1. Load Dataset
+    # =====================
+    df = read_table(data_path)
+
+    X = df.drop(columns=[TARGET])
+    y = df[TARGET]
+
+    # =====================
+    # 2. Train/Test Split
+    # =====================
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=0.2, random_state=42
+    )
+
+    # =====================
+    # 3. Baseline Model
+    # =====================
+    print("\n===== BASELINE MODEL =====")
+    baseline = XGBRegressor(objective="reg:squarederror", random_state=42, n_jobs=-1)
+    baseline.fit(X_train, y_train)
+    y_pred_baseline = baseline.predict(X_test)
+    baseline_rmse = np.sqrt(mean_squared_error(y_test, y_pred_baseline))
+    baseline_r2 = r2_score(y_test, y_pred_baseline)
+    print(f"Baseline RMSE: {baseline_rmse:.3f}")
+    print(f"Baseline R²:   {baseline_r2:.3f}")
+
+    # =====================
+    # 4. Hyperparameter Tuning
+    # =====================
+    param_grid = {
+        "n_estimators": [200, 400],
+        "max_depth": [4, 6],
+        "learning_rate": [0.05, 0.1],
+        "subsample": [0.8, 1.0],
+        "colsample_bytree": [0.8, 1.0]
+    }
+    search_start = time.perf_counter()
+    if search == "grid":
+        print("\n===== HYPERPARAMETER TUNING =====")
+        # Cores are split between concurrent CV fits and per-fit XGBoost threads
+        best_params, best_cv_rmse, schedule = scheduled_grid_search(
+            X_train.to_numpy(), y_train.to_numpy(), param_grid, cv=3,
+            base_params={"objective": "reg:squarederror", "random_state": 42}
+        )
+        print(f"Scheduled {schedule['fits']} fits on {schedule['concurrent_fits']} processes x "
+              f"{schedule['threads_per_fit']} threads, core utilization {schedule['core_utilization']:.0%}")
+
+        best_model = XGBRegressor(objective="reg:squarederror", random_state=42,
+                                  n_jobs=available_cpus(), **best_params)
+        best_model.fit(X_train, y_train)
+
+        print(f"Best Params: {best_params}")
+        print(f"Best CV RMSE: {best_cv_rmse:.3f}")
+    elif search == "halving":
+        print("\n===== HYPERPARAMETER TUNING (SUCCESSIVE HALVING) =====")
+        best_params, best_rmse, trials = successive_halving_search(
+            X_train, y_train, param_grid,
+            base_params={"objective": "reg:squarederror", "random_state": 42, "n_jobs": -1, "tree_method": "hist"},
+            budget_seconds=budget_seconds,
+            log_path="search_trials.json"
+        )
+        print(f"Best Params: {best_params}")
+        print(f"Validation RMSE: {best_rmse:.3f} after {len(trials)} trials (log: search_trials.json)")
+
+        best_model = XGBRegressor(objective="reg:squarederror", random_state=42, n_jobs=-1,
+                                  tree_method="hist", **best_params)
+        best_model.fit(X_train, y_train)
+    else:
+        best_params = dict(DEFAULT_PARAMS)
+        best_model = XGBRegressor(objective="reg:squarederror", random_state=42, n_jobs=-1,
+                                  tree_method="hist", **best_params)
+        best_model.fit(X_train, y_train)
+    search_seconds = time.perf_counter() - search_start
+
+    # =====================
+    # 5. Final Model Evaluation
+    # =====================
+    y_pred_final = best_model.predict(X_test)
+    final_rmse = np.sqrt(mean_squared_error(y_test, y_pred_final))
+    final_r2 = r2_score(y_test, y_pred_final)
+
+    print("\n===== FINAL MODEL =====")
+    print(f"Final RMSE: {final_rmse:.3f}")
+    print(f"Final R²:   {final_r2:.3f}")
+
+    metrics = {"baseline_rmse": float(baseline_rmse), "baseline_r2": float(baseline_r2),
+               "final_rmse": float(final_rmse), "final_r2": float(final_r2),
+               "best_params": best_params, "search": search, "search_seconds": round(search_seconds, 2)}
+    return best_model, X.columns.tolist(), metrics
+
+
+class ChunkIterator(xgb.DataIter):
+    """Feeds XGBoost one part file at a time; only the current chunk is held in memory"""
+
+    def __init__(self, files, feature_cols, cache_prefix):
+        self._files = files
+        self._feature_cols = feature_cols
+        self._index = 0
+        super().__init__(cache_prefix=cache_prefix)
+
+    def next(self, input_data):
+        if self._index == len(self._files):
+            return 0
+        chunk = read_table(self._files[self._index], self._feature_cols + [TARGET])
+        input_data(data=chunk[self._feature_cols].to_numpy(np.float32),
+                   label=chunk[TARGET].to_numpy(np.float32),
+                   feature_names=self._feature_cols)
+        self._index += 1
+        return 1
+
+    def reset(self):
+        self._index = 0
+
+
+def train_external_memory(chunk_dir, test_chunks=1, params=None, cache_dir=None):
+    """Train the same hist-based model from on-disk part files via an external-memory DMatrix"""
+    # part-*.csv or columnar part-*.cols directories from create_synthetic_data.py --output-dir
+    files = sorted(glob.glob(os.path.join(chunk_dir, "part-*.csv")) + glob.glob(os.path.join(chunk_dir, "part-*.cols")))
+    if len(files) <= test_chunks:
+        raise ValueError(f"Need more than {test_chunks} part files in {chunk_dir}, found {len(files)}")
+    train_files, test_files = files[:-test_chunks], files[-test_chunks:]
+    feature_cols = [c for c in column_names(files[0]) if c != TARGET]
+    params = dict(params or DEFAULT_PARAMS)
+
+    print(f"\n===== OUT-OF-CORE TRAINING ({len(train_files)} train / {len(test_files)} test chunks) =====")
+    cache_dir = cache_dir or tempfile.mkdtemp(prefix="xgb-cache-")
+    try:
+        # Quantized pages are cached on disk under cache_prefix and streamed each round
+        dtrain = xgb.DMatrix(ChunkIterator(train_files, feature_cols, os.path.join(cache_dir, "train")))
+
+        model = XGBRegressor(objective="reg:squarederror", random_state=42, n_jobs=-1,
+                             tree_method="hist", **params)
+        booster = xgb.train(
+            {**model.get_xgb_params(), "tree_method": "hist"},
+            dtrain,
+            num_boost_round=params["n_estimators"],
+        )
+        del dtrain
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    # Wrap the booster so the app keeps calling model.predict(DataFrame)
+    model.load_model(bytearray(booster.save_raw("ubj")))
+
+    # Held-out chunks are small enough to evaluate in memory
+    test = pd.concat([read_table(f) for f in test_files], ignore_index=True)
+    y_pred = model.predict(test[feature_cols])
+    final_rmse = np.sqrt(mean_squared_error(test[TARGET], y_pred))
+    final_r2 = r2_score(test[TARGET], y_pred)
+
+    print(f"Final RMSE: {final_rmse:.3f}")
+    print(f"Final R²:   {final_r2:.3f}")
+
+    metrics = {"final_rmse": float(final_rmse), "final_r2": float(final_r2), "best_params": params}
+    return model, feature_cols, metrics
+
+
+def save_artifacts(model, feature_cols, metrics):
+    # =====================
+    # 6. Feature Importance
+    # =====================
+    import matplotlib.pyplot as plt
+
+    importances = model.feature_importances_
+    sorted_idx = np.argsort(importances)[::-1]
+    plt.figure(figsize=(10, 6))
+    plt.bar(range(len(importances)), importances[sorted_idx])
+    plt.xticks(range(len(importances)), np.array(feature_cols)[sorted_idx], rotation=45, ha="right")
+    plt.title("Feature Importances (XGBoost)")
+    plt.tight_layout()
+    plt.savefig("feature_importances.png")
+    plt.close()
+    print("✅ Feature importance plot saved as feature_importances.png")
+
+    # =====================
+    # 7. Save Model + Metrics
+    # =====================
+    os.makedirs(os.path.dirname(MODEL_PATH), exist_ok=True)
+    importance = [{"feature": feature_cols[i], "importance": float(importances[i])} for i in sorted_idx]
+    manifest = write_bundle(MODEL_PATH, model, feature_cols, feature_importance=importance, metrics=metrics)
+    with open("xgb_model_metrics.json", "w") as f:
+        json.dump(metrics, f, indent=4)
+
+    print(f"✅ Model bundle {manifest['model_version']} saved as {MODEL_PATH}")
+    print("✅ Metrics saved as xgb_model_metrics.json")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the XGBoost mental health regressor")
+    parser.add_argument("--mode", choices=["in-memory", "external"], default="in-memory")
+    parser.add_argument("--data", default=DATA_PATH,
+                        help="CSV or columnar .cols dataset for in-memory training")
+    parser.add_argument("--chunk-dir", default="chunks",
+                        help="directory of part-*.csv or part-*.cols files for external-memory training")
+    parser.add_argument("--test-chunks", type=int, default=1, help="part files held out for evaluation")
+    parser.add_argument("--search", choices=["grid", "halving", "none"], default="grid",
+                        help="tuning for in-memory mode; 'none' fits DEFAULT_PARAMS (comparable with --mode external)")
+    parser.add_argument("--budget", type=float, default=None, help="wall-clock budget in seconds for --search halving")
+    parser.add_argument("--no-save", action="store_true", help="only report metrics, don't write artifacts")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.mode == "external":
+        model, feature_cols, metrics = train_external_memory(args.chunk_dir, args.test_chunks)
+    else:
+        model, feature_cols, metrics = train_in_memory(args.data, args.search, args.budget)
+
+    # Resource usage for comparing the in-memory and out-of-core paths
+    metrics["training_mode"] = args.mode
+    metrics["wall_time_s"] = round(time.perf_counter() - start, 2)
+    metrics["peak_rss_mb"] = round(peak_rss_mb(), 1)
+    print(f"\nMode: {args.mode}  wall time: {metrics['wall_time_s']}s  peak RSS: {metrics['peak_rss_mb']} MB")
+
+    if not args.no_save:
+        save_artifacts(model, feature_cols, metrics)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+"""
+Declarative feature schemas for decoding questionnaire input
+Each field names its default, valid range and, for categorical answers,
+the label-to-code map. A schema is compiled against a model's feature order
+into a decoder that writes straight into a float32 row or batch buffer.
+The questionnaire app and the create_dataset app encode some answers
+differently (their models were trained on different encodings), so each
+has its own field table here.
+
+    python feature_schema.py    # decode the payloads in CHECK_CASES and compare
+"""
+
+import sys
+from collections import namedtuple
+
+import numpy as np
+
+FeatureField = namedtuple('FeatureField', ['name', 'default', 'low', 'high', 'categories'])
+
+# Value for an answer left blank when the model should treat it as missing
+MISSING = float('nan')
+
+
+def numeric(name, default, low, high):
+    return FeatureField(name, default, low, high, None)
+
+
+def categorical(name, categories, default):
+    """Answer given as a label from categories or directly as one of its codes"""
+    codes = categories.values()
+    return FeatureField(name, default, min(codes), max(codes), dict(categories))
+
+
+# Encoding of the questionnaire page (app.py)
+QUESTIONNAIRE_FIELDS = [
+    numeric('age', 20, 16, 100),
+    categorical('gender', {'male': 0, 'female': 1, 'non_binary': 2, 'prefer_not_to_say': 2}, 0),
+    categorical('academic_year', {'1': 1, '2': 2, '3': 3, '4': 4, 'graduate': 5}, 2),
+    categorical('major', {
+        'engineering': 0, 'medicine': 1, 'business': 2, 'arts': 3,
+        'science': 4, 'computer_science': 5, 'social_sciences': 6, 'other': 7
+    }, 7),
+    numeric('cgpa', 3.0, 0, 10),
+    categorical('residential_status', {'on_campus': 0, 'off_campus': 1, 'with_family': 2}, 2),
+    numeric('sleep_duration', 7, 0, 24),
+    numeric('dietary_habits', 3, 1, 5),
+    numeric('physical_activity', 3, 1, 5),
+    numeric('social_connectedness', 3, 1, 5),
+    numeric('screen_time', 6, 0, 24),
+    numeric('family_history', 0, 0, 1),
+    numeric('financial_stress', 2, 1, 5),
+    numeric('academic_pressure', 3, 1, 5),
+    numeric('treatment_history', 0, 0, 2),
+    numeric('coping_mechanisms', 3, 1, 5),
+]
+
+# Encoding of the synthetic dataset (create_dataset/); blanks stay missing for XGBoost
+DATASET_FIELDS = [
+    numeric('age', MISSING, 16, 100),
+    categorical('academic_year', {'1': 1, '2': 2, '3': 3, '4': 4}, MISSING),
+    categorical('gender', {'male': 0, 'female': 1, 'other': 2}, MISSING),
+    categorical('major', {'stem': 0, 'arts': 1, 'business': 2, 'other': 3}, MISSING),
+    categorical('residential_status', {'urban': 0, 'suburban': 1, 'rural': 2}, MISSING),
+    numeric('family_history', MISSING, 0, 1),
+    numeric('treatment_history', MISSING, 0, 1),
+    numeric('academic_pressure', MISSING, 1, 10),
+    numeric('social_connectedness', MISSING, 1, 10),
+    numeric('coping_mechanisms', MISSING, 1, 10),
+    numeric('financial_stress', MISSING, 1, 10),
+    numeric('dietary_habits', MISSING, 1, 10),
+    numeric('sleep_duration', MISSING, 0, 24),
+    numeric('physical_activity', MISSING, 0, 168),
+    numeric('screen_time', MISSING, 0, 24),
+    numeric('cgpa', MISSING, 0, 10),
+]
+
+
+class SchemaError(ValueError):
+    """Raised for an answer outside its field's range or categories"""
+
+    def __init__(self, field, message, index=None):
+        super().__init__(f"{field}: {message}")
+        self.field = field
+        # Position in a batch, set by decode_batch
+        self.index = index
+
+
+def _invalid(field, value):
+    raise SchemaError(field.name, f"expected a number, got {value!r}")
+
+
+def _out_of_range(field, number):
+    raise SchemaError(field.name, f"{number:g} is outside [{field.low:g}, {field.high:g}]")
+
+
+def _category_code(field, codes, value):
+    """Code for a categorical answer given as a number (e.g. 3 or '3' for academic_year)"""
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        number = None
+    if number not in codes:
+        raise SchemaError(field.name, f"unknown value {value!r}")
+    return number
+
+
+class CompiledSchema:
+    """Field table bound to a model feature order, decoding records into float32 rows
+
+    The fields are compiled into the source of one straight-line function
+    (no per-field loop or converter calls), which returns a tuple of feature
+    values that is copied into the output buffer with a single NumPy call.
+    """
+
+    def __init__(self, fields, feature_order):
+        by_name = {field.name: field for field in fields}
+        missing = [feature for feature in feature_order if feature not in by_name]
+        if missing:
+            raise ValueError(f"No schema field for features: {missing}")
+        self.feature_order = list(feature_order)
+        self.fields = [by_name[feature] for feature in self.feature_order]
+        self.source, self._decode_values = self._compile()
+
+    def _compile(self):
+        namespace = {'_invalid': _invalid, '_out_of_range': _out_of_range, '_category_code': _category_code}
+        lines = ['def decode_values(record):', '    get = record.get']
+        for i, field in enumerate(self.fields):
+            namespace[f'field{i}'] = field
+            # A global rather than a literal, since the default may be NaN
+            namespace[f'default{i}'] = float(field.default)
+            # Absent and blank answers keep the default
+            lines += [f'    value = get({field.name!r})',
+                      f"    if value is None or value == '':",
+                      f'        x{i} = default{i}',
+                      '    else:']
+            if field.categories:
+                namespace[f'categories{i}'] = {label: float(code) for label, code in field.categories.items()}
+                namespace[f'codes{i}'] = {float(code) for code in field.categories.values()}
+                lines += [f'        x{i} = categories{i}.get(value) if value.__class__ is str else None',
+                          f'        if x{i} is None:',
+                          f'            x{i} = _category_code(field{i}, codes{i}, value)']
+            else:
+                lines += ['        try:',
+                          f'            x{i} = float(value)',
+                          '        except (TypeError, ValueError):',
+                          f'            _invalid(field{i}, value)',
+                          # NaN fails the comparison and is rejected too
+                          f'        if not {float(field.low)!r} <= x{i} <= {float(field.high)!r}:',
+                          f'            _out_of_range(field{i}, x{i})']
+        lines.append(f"    return ({''.join(f'x{i}, ' for i in range(len(self.fields)))})")
+        source = '\n'.join(lines) + '\n'
+        exec(compile(source, f'<feature schema {id(self):x}>', 'exec'), namespace)
+        return source, namespace['decode_values']
+
+    def decode_into(self, record, row):
+        """Write one record (any mapping with .get) into a preallocated float32 row"""
+        row[:] = self._decode_values(record)
+        return row
+
+    def decode(self, record):
+        """Decode one record into a (1, n_features) float32 matrix"""
+        # Filling an empty row is cheaper than np.array's conversion of a nested sequence
+        row = np.empty((1, len(self.fields)), dtype=np.float32)
+        row[0] = self._decode_values(record)
+        return row
+
+    def decode_batch(self, records, out=None):
+        """Decode records into an (n, n_features) float32 matrix (out if given)
+
+        A SchemaError carries the index of the first invalid record.
+        """
+        decode_values = self._decode_values
+        try:
+            values = [decode_values(record) for record in records]
+        except SchemaError:
+            # Only the failure path pays for finding which record it was
+            for i, record in enumerate(records):
+                try:
+                    decode_values(record)
+                except SchemaError as e:
+                    e.index = i
+                    raise
+            raise
+        if out is None:
+            return np.array(values, dtype=np.float32).reshape(len(records), len(self.fields))
+        out[:len(values)] = values
+        return out[:len(values)]
+
+    def to_record(self, row):
+        """Feature dict for a decoded row, with each value's shortest float32 decimal (3.2, not 3.2000000476)"""
+        return {name: float(str(value)) for name, value in zip(self.feature_order, row)}
+
+
+# Questionnaire payloads as clients send them, with the features they must decode
+# to (a subset) or the field they must be rejected on
+CHECK_CASES = [
+    # JSON from static/js/main.js: numbers, academic_year as a string, graded history answers
+    ({'age': 21, 'gender': 'female', 'academic_year': '3', 'major': 'science', 'cgpa': 3.4,
+      'residential_status': 'on_campus', 'sleep_duration': 6, 'family_history': 0.5, 'treatment_history': 2},
+     {'age': 21, 'gender': 1, 'academic_year': 3, 'major': 4, 'cgpa': 3.4, 'residential_status': 0,
+      'family_history': 0.5, 'treatment_history': 2}),
+    ({'academic_year': 'graduate'}, {'academic_year': 5}),
+    # Form posts: every value a string, blanks keep the default
+    ({'age': '19', 'sleep_duration': '7.5', 'cgpa': '', 'major': ''}, {'age': 19, 'sleep_duration': 7.5, 'cgpa': 3.0,
+                                                                      'major': 7}),
+    # Booleans from older clients count as 0 / 1
+    ({'family_history': True, 'treatment_history': False}, {'family_history': 1, 'treatment_history': 0}),
+    # Numeric category codes are taken as codes (the pre-schema decoder replaced them with the default)
+    ({'academic_year': 3, 'gender': 1, 'major': 5, 'residential_status': 0.0},
+     {'academic_year': 3, 'gender': 1, 'major': 5, 'residential_status': 0}),
+    # JSON null keeps the default
+    ({'academic_year': None, 'age': None}, {'academic_year': 2, 'age': 20}),
+    # Out of range or unknown (accepted as-is before the schema)
+    ({'age': 15}, 'age'),
+    ({'cgpa': 11}, 'cgpa'),
+    ({'academic_year': 7}, 'academic_year'),
+    ({'gender': 'robot'}, 'gender'),
+    ({'sleep_duration': 'lots'}, 'sleep_duration'),
+    ({'screen_time': float('nan')}, 'screen_time'),
+]
+
+
+def check(fields=QUESTIONNAIRE_FIELDS, cases=CHECK_CASES):
+    """Decode every case and return a description of each mismatch"""
+    schema = CompiledSchema(fields, [field.name for field in fields])
+    failures = []
+    for payload, expected in cases:
+        try:
+            record = schema.to_record(schema.decode(payload)[0])
+        except SchemaError as e:
+            if e.field != expected:
+                failures.append(f"{payload!r}: rejected on {e.field}, expected {expected!r}")
+            continue
+        if isinstance(expected, str):
+            failures.append(f"{payload!r}: accepted, expected a rejection on {expected}")
+            continue
+        wrong = {name: record[name] for name, value in expected.items() if record[name] != value}
+        if wrong:
+            failures.append(f"{payload!r}: decoded {wrong}, expected {expected!r}")
+    return failures
+
+
+if __name__ == '__main__':
+    failures = check()
+    for failure in failures:
+        print(failure)
+    print(f"{len(CHECK_CASES) - len(failures)}/{len(CHECK_CASES)} schema cases passed")
+    sys.exit(1 if failures else 0)
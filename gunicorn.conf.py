@@ -0,0 +1,52 @@
+"""
+Production gunicorn settings for app.py
+
+    gunicorn -c gunicorn.conf.py app:app
+
+The app (model bundle included) is imported once in the master and the
+workers fork from it, sharing the model's pages copy-on-write. Workers are
+sized from the container's CPU quota rather than the host's core count, and
+each worker's XGBoost gets its share of those cores so the workers' OpenMP
+pools don't oversubscribe the CPUs. The master runs app.preload() (model
+deserialization, templates) so workers share it; every worker then runs
+app.warm_up() before it accepts connections, which only starts its own
+OpenMP pool. /readyz reports when that has happened.
+"""
+
+import os
+
+from cpu_quota import available_cpus
+
+cpus = available_cpus()
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', 0)) or cpus
+threads = int(os.environ.get('GUNICORN_THREADS', 1))
+worker_class = 'gthread' if threads > 1 else 'sync'
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+keepalive = 5
+# Heartbeat files on tmpfs so a slow disk can't get workers killed
+worker_tmp_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+# Load the model before forking
+preload_app = True
+
+# XGBoost threads per worker: the quota split across workers, at least one
+xgboost_nthread = int(os.environ.get('XGBOOST_NTHREAD', 0)) or max(1, cpus // workers)
+
+# The master only loads and validates the model; keep its OpenMP pool to a
+# single thread so forked workers don't inherit a busy multi-threaded runtime
+os.environ['XGBOOST_NTHREAD'] = '1'
+os.environ.setdefault('OMP_NUM_THREADS', str(xgboost_nthread))
+# The master only preloads shared state; warm-up predictions run per worker
+# in post_fork, after the nthread pin
+os.environ['WARM_UP'] = 'preload'
+
+
+def when_ready(server):
+    server.log.info(f"{workers} workers x {threads} threads, XGBoost nthread {xgboost_nthread} ({cpus} CPUs)")
+
+
+def post_fork(server, worker):
+    import app
+    app.configure_worker(xgboost_nthread)
@@ -0,0 +1,132 @@
+"""
+HTTP caching and compression for app.py
+Static files are read once at startup, fingerprinted by content hash and
+precompressed (gzip, plus brotli when the optional brotli package is
+installed), so serving one is a dictionary lookup. url_for('static') adds
+the fingerprint as ?v=, and those URLs are cached by browsers for a year.
+Every other GET response gets a content-hash ETag and gzip when the client
+accepts it, so revalidations are answered with a bodyless 304.
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+
+from flask import Response, abort, request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# For URLs carrying the current content hash, which change whenever the file does
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# Clients may keep a copy but must revalidate it (cheap with an ETag)
+REVALIDATE_CACHE_CONTROL = 'no-cache'
+# Smaller bodies aren't worth the compression overhead
+MIN_COMPRESS_BYTES = 1024
+# gzip level for responses compressed per request; precompressed bodies use the maximum
+DYNAMIC_GZIP_LEVEL = 6
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/javascript', 'image/svg+xml', 'image/x-icon',
+                      'image/vnd.microsoft.icon')
+
+
+def is_compressible(content_type):
+    return content_type is not None and content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def accepted_encoding(encodings):
+    """Best of the available encodings the client accepts ('identity' if none)"""
+    for encoding in ('br', 'gzip'):
+        if encoding in encodings and request.accept_encodings[encoding] > 0:
+            return encoding
+    return 'identity'
+
+
+class PreparedBody:
+    """Immutable response body with its ETag and precompressed variants"""
+
+    def __init__(self, body, content_type):
+        self.content_type = content_type
+        self.etag = hashlib.sha256(body).hexdigest()[:16]
+        self.variants = {'identity': body}
+        if is_compressible(content_type) and len(body) >= MIN_COMPRESS_BYTES:
+            # mtime=0 keeps the gzip bytes, and so the ETag, stable across restarts
+            compressed = {'gzip': gzip.compress(body, compresslevel=9, mtime=0)}
+            if brotli is not None:
+                compressed['br'] = brotli.compress(body, quality=11)
+            self.variants.update({name: data for name, data in compressed.items() if len(data) < len(body)})
+
+    def response(self, cache_control=REVALIDATE_CACHE_CONTROL):
+        """Response for the current request, or a 304 if the client's copy is current"""
+        encoding = accepted_encoding(self.variants)
+        response = Response(self.variants[encoding], content_type=self.content_type)
+        if encoding != 'identity':
+            response.headers['Content-Encoding'] = encoding
+        if len(self.variants) > 1:
+            response.vary.add('Accept-Encoding')
+        # Each encoding is a different representation, so it needs its own strong ETag
+        response.set_etag(self.etag if encoding == 'identity' else f"{self.etag}-{encoding}")
+        response.headers['Cache-Control'] = cache_control
+        return response.make_conditional(request)
+
+
+class StaticAssets:
+    """Prepared copies of every file under a static folder"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.files = {}
+        for root, _, filenames in os.walk(directory):
+            for filename in filenames:
+                path = os.path.join(root, filename)
+                with open(path, 'rb') as f:
+                    body = f.read()
+                content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+                if content_type.startswith('text/') or content_type == 'application/javascript':
+                    content_type += '; charset=utf-8'
+                name = os.path.relpath(path, directory).replace(os.sep, '/')
+                self.files[name] = PreparedBody(body, content_type)
+
+    def fingerprint(self, filename):
+        prepared = self.files.get(filename)
+        return prepared.etag if prepared else None
+
+    def serve(self, filename):
+        """View replacing Flask's static endpoint"""
+        prepared = self.files.get(filename)
+        if prepared is None:
+            abort(404)
+        # Only the URL for the current contents may be cached without revalidation
+        if request.args.get('v') == prepared.etag:
+            return prepared.response(IMMUTABLE_CACHE_CONTROL)
+        return prepared.response(REVALIDATE_CACHE_CONTROL)
+
+    def init_app(self, app):
+        app.view_functions['static'] = self.serve
+
+        @app.url_defaults
+        def add_static_fingerprint(endpoint, values):
+            if endpoint == 'static' and 'filename' in values:
+                fingerprint = self.fingerprint(values['filename'])
+                if fingerprint:
+                    values.setdefault('v', fingerprint)
+
+        app.after_request(finalize_response)
+
+
+def finalize_response(response):
+    """Compress and ETag dynamic GET responses; answers 304 when the client's copy matches"""
+    if (request.method not in ('GET', 'HEAD') or response.status_code != 200 or response.direct_passthrough
+            or response.get_etag()[0] is not None or 'Content-Encoding' in response.headers):
+        return response
+
+    body = response.get_data()
+    if (len(body) >= MIN_COMPRESS_BYTES and is_compressible(response.content_type)
+            and accepted_encoding(('gzip',)) == 'gzip'):
+        response.set_data(gzip.compress(body, compresslevel=DYNAMIC_GZIP_LEVEL, mtime=0))
+        response.headers['Content-Encoding'] = 'gzip'
+        response.vary.add('Accept-Encoding')
+    response.add_etag()
+    return response.make_conditional(request)
@@ -0,0 +1,107 @@
+"""
+Budgeted successive-halving hyperparameter search for XGBoost regressors
+Candidates start on a small data fraction with few boosting rounds; the best
+1/eta advance to larger fractions and more rounds. Every fit early-stops on
+a held-out validation split, and the search stops at a wall-clock budget.
+"""
+
+import json
+import math
+import time
+
+import numpy as np
+import xgboost as xgb
+from sklearn.metrics import mean_squared_error
+from sklearn.model_selection import ParameterGrid, train_test_split
+
+
+def _rows(X, index):
+    return X.iloc[index] if hasattr(X, 'iloc') else X[index]
+
+
+def successive_halving_search(X, y, param_grid, base_params=None, eta=3, min_fraction=None,
+                              min_rounds=50, early_stopping_rounds=20, budget_seconds=None,
+                              validation_size=0.2, random_state=42, log_path=None):
+    """Search param_grid with successive halving; returns (best_params, best_rmse, trials)
+
+    'n_estimators' in the grid is treated as an upper bound on boosting rounds:
+    early stopping picks the actual count, which is returned in best_params.
+    """
+    base_params = dict(base_params or {})
+    grid = dict(param_grid)
+    max_rounds = max(grid.pop('n_estimators', [base_params.pop('n_estimators', 100)]))
+    candidates = list(ParameterGrid(grid))
+
+    # Enough rungs to go from all candidates to one; the last rung uses all the data
+    n_rungs = max(1, math.ceil(math.log(len(candidates), eta)) + 1) if len(candidates) > 1 else 1
+    if min_fraction is None:
+        min_fraction = eta ** -(n_rungs - 1)
+
+    X_train, X_val, y_train, y_val = train_test_split(
+        X, y, test_size=validation_size, random_state=random_state
+    )
+    # One shuffled order so every rung trains on a growing prefix of the same rows
+    order = np.random.default_rng(random_state).permutation(len(y_train))
+
+    start = time.perf_counter()
+    trials = []
+    survivors = list(range(len(candidates)))
+    best = None  # (rung, rmse, params)
+
+    for rung in range(n_rungs):
+        fraction = min(1.0, min_fraction * eta ** rung)
+        rounds = max_rounds if rung == n_rungs - 1 else min(max_rounds, min_rounds * eta ** rung)
+        subset = order[:max(1, int(len(order) * fraction))]
+        X_rung, y_rung = _rows(X_train, subset), _rows(y_train, subset)
+
+        scores = []
+        for candidate in survivors:
+            if budget_seconds is not None and time.perf_counter() - start > budget_seconds:
+                break
+
+            params = {**base_params, **candidates[candidate]}
+            model = xgb.XGBRegressor(n_estimators=rounds, early_stopping_rounds=early_stopping_rounds, **params)
+            fit_start = time.perf_counter()
+            model.fit(X_rung, y_rung, eval_set=[(X_val, y_val)], verbose=False)
+            fit_seconds = time.perf_counter() - fit_start
+
+            rmse = float(np.sqrt(mean_squared_error(y_val, model.predict(X_val))))
+            best_iteration = int(model.best_iteration)
+            scores.append((rmse, candidate))
+            trials.append({
+                'rung': rung,
+                'candidate': candidate,
+                'params': candidates[candidate],
+                'data_fraction': round(fraction, 4),
+                'n_rows': len(subset),
+                'max_rounds': rounds,
+                'best_iteration': best_iteration,
+                'val_rmse': rmse,
+                'fit_seconds': round(fit_seconds, 3),
+                'elapsed_seconds': round(time.perf_counter() - start, 3)
+            })
+
+            # Prefer results from the highest rung reached (more data, more rounds)
+            if best is None or (rung, -rmse) > (best[0], -best[1]):
+                best = (rung, rmse, {**candidates[candidate], 'n_estimators': best_iteration + 1})
+
+        if not scores or (budget_seconds is not None and time.perf_counter() - start > budget_seconds):
+            break
+        scores.sort()
+        survivors = [candidate for _, candidate in scores[:max(1, len(scores) // eta)]]
+
+    if best is None:
+        raise RuntimeError("Search budget exhausted before any trial finished")
+
+    if log_path:
+        with open(log_path, 'w') as f:
+            json.dump({
+                'total_seconds': round(time.perf_counter() - start, 3),
+                'n_candidates': len(candidates),
+                'eta': eta,
+                'best_params': best[2],
+                'best_val_rmse': best[1],
+                'trials': trials
+            }, f, indent=4)
+
+    return best[2], best[1], trials
@@ -0,0 +1,234 @@
+"""
+Single-file, versioned model bundle
+Replaces the separate model/scaler/importance/metrics/metadata pickles with
+one file that can be memory-mapped:
+
+    b'MHBUNDLE' | uint32 format version | uint32 manifest length | manifest JSON
+    | 64-byte aligned raw array sections
+
+The manifest records each section's dtype/shape/offset, the feature schema,
+metrics and a SHA-256 checksum of the section payload. Sections hold the
+native XGBoost UBJSON model, the scaler parameters and the flattened trees
+used by the NumPy inference engine. The native engine reads its trees straight
+from the mapping, so forked workers share those pages. XGBoost builds its own
+copy of the model in process memory; that copy is only shared when it is
+deserialized before fork, as gunicorn's preload does.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+from datetime import datetime
+
+import numpy as np
+
+from tree_engine import TreeEnsemble
+
+MAGIC = b'MHBUNDLE'
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+_HEADER = struct.Struct('<8sII')
+
+
+class BundleError(Exception):
+    """Raised when a bundle is missing, malformed or fails its checksum"""
+
+
+def _json_default(value):
+    # Metrics from sklearn/numpy come back as numpy scalars
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def booster_type(booster):
+    """'gbtree', 'dart' or 'gblinear'"""
+    return json.loads(booster.save_config())['learner']['gradient_booster']['name']
+
+
+def booster_predict(booster, X):
+    """Predictions of a Booster; inplace_predict only supports tree boosters, so gblinear goes through a DMatrix"""
+    if booster_type(booster) == 'gblinear':
+        from xgboost import DMatrix
+        return booster.predict(DMatrix(X))
+    return booster.inplace_predict(X)
+
+
+def _align(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def write_bundle(path, model, feature_names, scaler=None, scaler_folded=False,
+                 feature_importance=None, metrics=None, metadata=None, model_version=None,
+                 validation_inputs=None):
+    """Write a model and everything needed to serve it into one bundle file
+
+    model is an XGBRegressor or Booster. When scaler_folded is True the model
+    already takes raw features and the scaler parameters are stored for reference.
+    validation_inputs are raw feature rows stored with the model's predictions
+    for them, so a loader can check it reproduces the same scores.
+    """
+    booster = model.get_booster() if hasattr(model, 'get_booster') else model
+
+    sections = {'model_ubj': np.frombuffer(bytes(booster.save_raw('ubj')), dtype=np.uint8)}
+    if scaler is not None:
+        sections['scaler_mean'] = np.asarray(scaler.mean_, dtype=np.float64)
+        sections['scaler_scale'] = np.asarray(scaler.scale_, dtype=np.float64)
+    if validation_inputs is not None:
+        inputs = np.asarray(validation_inputs, dtype=np.float64)
+        model_inputs = inputs if scaler_folded or scaler is None else scaler.transform(inputs)
+        sections['validation_inputs'] = inputs
+        sections['validation_expected'] = np.asarray(booster_predict(booster, model_inputs), dtype=np.float32)
+
+    native_params = None
+    try:
+        tree_arrays, native_params = TreeEnsemble.from_booster(booster).to_arrays()
+        sections.update({f'tree_{name}': array for name, array in tree_arrays.items()})
+    except ValueError as e:
+        print(f"Bundle will not include native trees: {e}")
+
+    # Lay the sections out back to back on aligned offsets
+    entries = {}
+    payload = bytearray()
+    for name, array in sections.items():
+        array = np.ascontiguousarray(array)
+        offset = _align(len(payload))
+        payload.extend(b'\0' * (offset - len(payload)))
+        payload.extend(array.tobytes())
+        entries[name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+
+    checksum = hashlib.sha256(payload).hexdigest()
+    created = datetime.now().isoformat()
+    manifest = {
+        'format_version': FORMAT_VERSION,
+        'model_version': model_version or f"{created[:10]}-{checksum[:8]}",
+        'created': created,
+        'checksum_sha256': checksum,
+        'feature_names': list(feature_names),
+        'scaler_folded': bool(scaler_folded),
+        'native_params': native_params,
+        'feature_importance': feature_importance or [],
+        'metrics': metrics or {},
+        'metadata': metadata or {},
+        'sections': entries
+    }
+    manifest_bytes = json.dumps(manifest, default=_json_default).encode('utf-8')
+
+    # Sections start on an aligned offset after the header and manifest
+    data_start = _align(_HEADER.size + len(manifest_bytes))
+    # Write beside the target and rename over it: running servers keep their
+    # mapping of the old file, and watchers never see a half-written bundle
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, len(manifest_bytes)))
+        f.write(manifest_bytes)
+        f.write(b'\0' * (data_start - _HEADER.size - len(manifest_bytes)))
+        f.write(payload)
+    os.replace(tmp_path, path)
+
+    return manifest
+
+
+class ModelBundle:
+    """Read-only view of a bundle file; arrays are zero-copy views of an mmap"""
+
+    def __init__(self, path, verify=True):
+        self.path = path
+        with open(path, 'rb') as f:
+            try:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError as e:
+                raise BundleError(f"Empty bundle file: {path}") from e
+
+        if len(self._mmap) < _HEADER.size:
+            raise BundleError(f"Truncated bundle: {path}")
+        magic, version, manifest_length = _HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise BundleError(f"Not a model bundle: {path}")
+        if version > FORMAT_VERSION:
+            raise BundleError(f"Bundle format {version} is newer than supported ({FORMAT_VERSION})")
+
+        self.manifest = json.loads(self._mmap[_HEADER.size:_HEADER.size + manifest_length])
+        self._data_start = _align(_HEADER.size + manifest_length)
+
+        buffer = memoryview(self._mmap)[self._data_start:]
+        if verify and hashlib.sha256(buffer).hexdigest() != self.manifest['checksum_sha256']:
+            raise BundleError(f"Checksum mismatch for {path}")
+
+        self.arrays = {}
+        for name, entry in self.manifest['sections'].items():
+            dtype = np.dtype(entry['dtype'])
+            count = int(np.prod(entry['shape'])) if entry['shape'] else 1
+            self.arrays[name] = np.frombuffer(
+                buffer, dtype=dtype, count=count, offset=entry['offset']
+            ).reshape(entry['shape'])
+
+    @property
+    def version(self):
+        return self.manifest['model_version']
+
+    @property
+    def feature_names(self):
+        return self.manifest['feature_names']
+
+    @property
+    def scaler_folded(self):
+        return self.manifest['scaler_folded']
+
+    def load_regressor(self):
+        """XGBRegressor deserialized from the UBJSON section
+
+        The model lives in this process's memory, not the mapping; load it
+        before forking for workers to share it.
+        """
+        import xgboost as xgb
+
+        model = xgb.XGBRegressor()
+        model.load_model(bytearray(self.arrays['model_ubj']))
+        # load_model doesn't restore the booster parameter, which predict() needs
+        # to avoid inplace prediction for a linear model
+        model.set_params(booster=booster_type(model.get_booster()))
+        return model
+
+    def load_scaler(self):
+        """StandardScaler rebuilt from the stored mean/scale, or None"""
+        if 'scaler_mean' not in self.arrays:
+            return None
+        from sklearn.preprocessing import StandardScaler
+
+        scaler = StandardScaler()
+        scaler.mean_ = np.array(self.arrays['scaler_mean'])
+        scaler.scale_ = np.array(self.arrays['scaler_scale'])
+        scaler.var_ = scaler.scale_ ** 2
+        scaler.n_features_in_ = len(scaler.mean_)
+        return scaler
+
+    def load_tree_ensemble(self):
+        """Native engine whose node arrays point straight into the mapped file"""
+        if self.manifest.get('native_params') is None:
+            return None
+        arrays = {name: self.arrays[f'tree_{name}'] for name in TreeEnsemble.ARRAY_FIELDS}
+        arrays.update({name: self.arrays[f'tree_{name}'] for name in TreeEnsemble.OPTIONAL_ARRAY_FIELDS
+                       if f'tree_{name}' in self.arrays})
+        return TreeEnsemble.from_arrays(arrays, self.manifest['native_params'])
+
+
+def load_bundle(path, verify=True):
+    """Open and validate a bundle file"""
+    return ModelBundle(path, verify=verify)
+
+
+if __name__ == '__main__':
+    import sys
+
+    if len(sys.argv) != 2:
+        print("Usage: python model_bundle.py <bundle file>")
+        sys.exit(1)
+    bundle = load_bundle(sys.argv[1])
+    summary = {key: value for key, value in bundle.manifest.items() if key != 'sections'}
+    summary['sections'] = {name: array.shape for name, array in bundle.arrays.items()}
+    print(json.dumps(summary, indent=2, default=str))
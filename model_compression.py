@@ -0,0 +1,279 @@
+"""
+Post-training model compression
+Builds smaller candidates from a trained regressor: the full model truncated
+to fewer boosting rounds, shallow refits (depth 1 is an additive, GAM-style
+model) and a linear model, all distilled from the full model's predictions
+on the training inputs. Each candidate is scored on held-out data (RMSE,
+risk-band accuracy, agreement with the full model's bands) and timed, and
+the smallest one within the accuracy tolerance is exported as a bundle.
+
+    python model_compression.py [--bundle models/mental_health_model.bundle] [--dry-run]
+    python model_compression.py --bundle create_dataset/models/xgb_mental_health_model.bundle \\
+        --dataset create_dataset/student_mental_health_synthetic.csv --target mental_health_condition
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+import xgboost as xgb
+
+from columnar_dataset import read_table
+from model_bundle import booster_predict, booster_type, load_bundle, write_bundle
+
+# Fractions of the full model's boosting rounds kept by the truncated candidates
+TRUNCATE_FRACTIONS = (0.1, 0.25, 0.5)
+# (max_depth, n_estimators) of the refit candidates
+REFIT_SHAPES = ((1, 100), (1, 300), (2, 100), (2, 200), (3, 50), (3, 100))
+# Allowed held-out RMSE increase over the full model (relative)
+RMSE_TOLERANCE = 0.02
+# Allowed drop in risk-band accuracy (absolute)
+BAND_TOLERANCE = 0.01
+# Seed for generated evaluation data; train_model.py seeds its generator with 42,
+# so reusing that stream would score candidates on the training rows
+EVAL_SEED = 20240917
+
+
+def risk_bands(scores):
+    """Low (>= 80), moderate (>= 60) and high risk, as in training and serving"""
+    return np.where(scores >= 80, 0, np.where(scores >= 60, 1, 2))
+
+
+def _booster(model):
+    return model.get_booster() if hasattr(model, 'get_booster') else model
+
+
+def predict(model, X):
+    return booster_predict(_booster(model), X)
+
+
+def model_size(model):
+    """Serialized (UBJSON) size in bytes, as stored in a bundle"""
+    return len(_booster(model).save_raw('ubj'))
+
+
+def measure_latency(model, X, batch_size, repeats):
+    """Median seconds per prediction call on batch_size rows"""
+    booster = _booster(model)
+    batch = np.ascontiguousarray(X[:batch_size])
+    booster_predict(booster, batch)
+    durations = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        booster_predict(booster, batch)
+        durations.append(time.perf_counter() - start)
+    return float(np.median(durations))
+
+
+def truncated_candidates(model, fractions=TRUNCATE_FRACTIONS):
+    """The full model cut to its first rounds; no retraining needed"""
+    booster = _booster(model)
+    rounds = booster.num_boosted_rounds()
+    candidates = {}
+    for fraction in fractions:
+        kept = max(1, int(rounds * fraction))
+        if kept < rounds:
+            candidates[f'truncated_{kept}'] = booster[:kept]
+    return candidates
+
+
+def refit_candidates(X_train, teacher_train, shapes=REFIT_SHAPES, n_jobs=None):
+    """Shallow ensembles fitted to the full model's predictions"""
+    candidates = {}
+    for max_depth, n_estimators in shapes:
+        student = xgb.XGBRegressor(objective='reg:squarederror', max_depth=max_depth, n_estimators=n_estimators,
+                                   learning_rate=0.1, random_state=42, n_jobs=n_jobs)
+        student.fit(X_train, teacher_train)
+        candidates[f'refit_depth{max_depth}_{n_estimators}'] = student
+    return candidates
+
+
+def distilled_linear(X_train, teacher_train):
+    """Least-squares linear model of the full model's predictions, as an XGBoost gblinear booster
+
+    Stored as gblinear so the bundle, loader and hot-swap path stay unchanged.
+    """
+    X = np.asarray(X_train, dtype=np.float64)
+    design = np.hstack([X, np.ones((len(X), 1))])
+    coefficients, *_ = np.linalg.lstsq(design, np.asarray(teacher_train, dtype=np.float64), rcond=None)
+
+    # Fit one round to get a valid gblinear model, then overwrite its parameters
+    template = xgb.XGBRegressor(booster='gblinear', objective='reg:squarederror', n_estimators=1)
+    template.fit(X[:2], np.zeros(2))
+    model_json = json.loads(template.get_booster().save_raw('json'))
+    # The intercept goes in gblinear's trailing bias weight, on top of a zero base_score
+    model_json['learner']['learner_model_param']['base_score'] = '0'
+    model_json['learner']['gradient_booster']['model']['weights'] = [float(w) for w in coefficients]
+
+    booster = xgb.Booster()
+    booster.load_model(bytearray(json.dumps(model_json).encode('utf-8')))
+    return booster
+
+
+def evaluate(model, X_test, y_test, teacher_test):
+    """Accuracy, size and latency of one candidate on held-out data"""
+    predictions = predict(model, X_test)
+    bands = risk_bands(predictions)
+    booster = _booster(model)
+    model_json = json.loads(booster.save_raw('json'))
+    trees = model_json['learner']['gradient_booster'].get('model', {}).get('trees', [])
+    return {
+        'size_bytes': model_size(model),
+        'trees': len(trees),
+        'nodes': sum(len(tree['left_children']) for tree in trees),
+        'rmse': float(np.sqrt(np.mean((predictions - y_test) ** 2))),
+        'rmse_vs_full': float(np.sqrt(np.mean((predictions - teacher_test) ** 2))),
+        'band_accuracy': float(np.mean(bands == risk_bands(y_test))),
+        'band_agreement': float(np.mean(bands == risk_bands(teacher_test))),
+        'latency_1_us': round(measure_latency(model, X_test, 1, 200) * 1e6, 1),
+        'latency_1000_us': round(measure_latency(model, X_test, 1000, 20) * 1e6, 1)
+    }
+
+
+def compress_model(model, X_train, X_test, y_test, rmse_tolerance=RMSE_TOLERANCE, band_tolerance=BAND_TOLERANCE,
+                   n_jobs=None):
+    """Score every candidate and return (smallest model within tolerance, report)
+
+    X_train only needs the training inputs: students learn the full model's
+    predictions, not the original labels. The full model is a candidate too,
+    so there is always a result.
+    """
+    X_train = np.asarray(X_train, dtype=np.float32)
+    X_test = np.asarray(X_test, dtype=np.float32)
+    y_test = np.asarray(y_test, dtype=np.float64)
+    teacher_train = predict(model, X_train)
+    teacher_test = predict(model, X_test).astype(np.float64)
+
+    candidates = {'full': _booster(model)}
+    candidates.update(truncated_candidates(model))
+    candidates.update(refit_candidates(X_train, teacher_train, n_jobs=n_jobs))
+    candidates['distilled_linear'] = distilled_linear(X_train, teacher_train)
+
+    results = {name: evaluate(candidate, X_test, y_test, teacher_test) for name, candidate in candidates.items()}
+    full = results['full']
+    max_rmse = full['rmse'] * (1 + rmse_tolerance)
+    min_band_accuracy = full['band_accuracy'] - band_tolerance
+    for result in results.values():
+        result['within_tolerance'] = result['rmse'] <= max_rmse and result['band_accuracy'] >= min_band_accuracy
+
+    chosen = min((name for name, result in results.items() if result['within_tolerance']),
+                 key=lambda name: (results[name]['size_bytes'], results[name]['latency_1_us']))
+    report = {
+        'chosen': chosen,
+        'rmse_tolerance': rmse_tolerance,
+        'band_tolerance': band_tolerance,
+        'candidates': results
+    }
+    return candidates[chosen], report
+
+
+def _feature_importance(model, feature_names, X_train):
+    """Normalized importance of the exported model
+
+    Gain for trees; for a linear model, each weight times its input's
+    standard deviation, since raw weights depend on the feature's scale.
+    """
+    booster = _booster(model)
+    if booster_type(booster) == 'gblinear':
+        weights = json.loads(booster.save_raw('json'))['learner']['gradient_booster']['model']['weights'][:-1]
+        scores = dict(zip(feature_names, np.abs(weights) * np.std(X_train, axis=0)))
+    else:
+        scores = {feature_names[int(name[1:])] if name.startswith('f') and name[1:].isdigit() else name: value
+                  for name, value in booster.get_score(importance_type='gain').items()}
+    total = sum(scores.values()) or 1.0
+    importance = [{'feature': feature, 'importance': float(scores.get(feature, 0.0) / total)} for feature in feature_names]
+    return sorted(importance, key=lambda row: row['importance'], reverse=True)
+
+
+def compress_bundle(path, train_data, test_data, target, output=None, rmse_tolerance=RMSE_TOLERANCE,
+                    band_tolerance=BAND_TOLERANCE, dry_run=False):
+    """Compress the model in a bundle against held-out data and write the result
+
+    Writes nothing when the full model is still the smallest within
+    tolerance or when dry_run is set. Returns the report.
+    """
+    bundle = load_bundle(path)
+    feature_names = bundle.feature_names
+    scaler = bundle.load_scaler() if 'scaler_mean' in bundle.arrays else None
+
+    def model_inputs(data):
+        X = data[feature_names].to_numpy(dtype=np.float64)
+        return X if bundle.scaler_folded or scaler is None else scaler.transform(X)
+
+    X_train = model_inputs(train_data)
+    model, report = compress_model(bundle.load_regressor(), X_train, model_inputs(test_data),
+                                   test_data[target].to_numpy(), rmse_tolerance, band_tolerance)
+    report['source_version'] = bundle.version
+    if dry_run or report['chosen'] == 'full':
+        return report
+
+    chosen = report['candidates'][report['chosen']]
+    metrics = dict(bundle.manifest['metrics'], band_accuracy=chosen['band_accuracy'], rmse=chosen['rmse'],
+                   compression=report)
+    metadata = dict(bundle.manifest['metadata'], compressed_from=bundle.version, compression=report['chosen'])
+    validation_inputs = np.array(bundle.arrays['validation_inputs']) if 'validation_inputs' in bundle.arrays else None
+    manifest = write_bundle(
+        output or path, model, feature_names, scaler=scaler, scaler_folded=bundle.scaler_folded,
+        feature_importance=_feature_importance(model, feature_names, X_train), metrics=metrics, metadata=metadata,
+        validation_inputs=validation_inputs
+    )
+    report['exported_version'] = manifest['model_version']
+    report['output'] = output or path
+    return report
+
+
+def print_report(report):
+    print(f"\n{'candidate':<24}{'KB':>9}{'trees':>7}{'RMSE':>8}{'vs full':>9}{'band acc':>10}"
+          f"{'agree':>8}{'1 row us':>10}{'1000 us':>10}  ok")
+    for name, result in sorted(report['candidates'].items(), key=lambda item: item[1]['size_bytes']):
+        print(f"{name:<24}{result['size_bytes'] / 1024:>9.1f}{result['trees']:>7}{result['rmse']:>8.3f}"
+              f"{result['rmse_vs_full']:>9.3f}{result['band_accuracy']:>10.3f}{result['band_agreement']:>8.3f}"
+              f"{result['latency_1_us']:>10.1f}{result['latency_1000_us']:>10.1f}  "
+              f"{'*' if name == report['chosen'] else ('yes' if result['within_tolerance'] else '-')}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compress a trained model bundle within an accuracy tolerance")
+    parser.add_argument('--bundle', default='models/mental_health_model.bundle')
+    parser.add_argument('--output', default=None, help="bundle to write (default: overwrite --bundle)")
+    parser.add_argument('--dataset', default=None,
+                        help="CSV or columnar dataset with features and --target (default: fresh data from train_model.py's generator)")
+    parser.add_argument('--target', default='mental_health_score')
+    parser.add_argument('--samples', type=int, default=10500, help="rows generated when no --dataset is given")
+    parser.add_argument('--seed', type=int, default=EVAL_SEED,
+                        help="seed for generated data (must differ from train_model.py's 42)")
+    parser.add_argument('--test-size', type=float, default=0.2)
+    parser.add_argument('--rmse-tolerance', type=float, default=RMSE_TOLERANCE,
+                        help="allowed relative increase in held-out RMSE")
+    parser.add_argument('--band-tolerance', type=float, default=BAND_TOLERANCE,
+                        help="allowed absolute drop in risk-band accuracy")
+    parser.add_argument('--dry-run', action='store_true', help="report candidates without writing a bundle")
+    parser.add_argument('--report', default=None, help="also write the report as JSON")
+    args = parser.parse_args()
+
+    if args.dataset:
+        data = read_table(args.dataset)
+    else:
+        from train_model import generate_synthetic_dataset
+        if args.seed == 42:
+            parser.error("--seed 42 regenerates train_model.py's training data")
+        np.random.seed(args.seed)
+        data = generate_synthetic_dataset(n_samples=args.samples)
+    data = data.sample(frac=1.0, random_state=7).reset_index(drop=True)
+    n_test = int(len(data) * args.test_size)
+    report = compress_bundle(args.bundle, data.iloc[n_test:], data.iloc[:n_test], args.target, args.output,
+                             args.rmse_tolerance, args.band_tolerance, args.dry_run)
+
+    print_report(report)
+    if 'exported_version' in report:
+        print(f"\nExported {report['chosen']} as {report['exported_version']} to {report['output']}")
+    else:
+        print(f"\nChosen: {report['chosen']} (nothing written)")
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
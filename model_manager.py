@@ -0,0 +1,253 @@
+"""
+Model hot-swap for the serving process
+A ModelManager owns the model currently serving requests as one immutable
+ModelState. Replacements are loaded, warmed up and validated off the request
+path and then published with a single reference assignment, so a request
+that grabbed the old state finishes on it and never sees a half-loaded model.
+Reloads come from a watcher thread polling the bundle file or from an
+explicit reload() call (the admin endpoint in app.py).
+"""
+
+import os
+import threading
+import time
+
+import numpy as np
+
+from model_bundle import load_bundle
+
+
+class ModelValidationError(Exception):
+    """Raised when a freshly loaded model fails its checks and is not swapped in"""
+
+
+class ModelState:
+    """Everything one model version needs to serve a prediction"""
+
+    def __init__(self, bundle, backend='xgboost', native_max_batch=4, nthread=None):
+        self.bundle = bundle
+        self.version = bundle.version
+        self.native_max_batch = native_max_batch
+        self.nthread = nthread
+
+        # A scaler-folded model takes raw feature values, so no scaler is needed
+        self.scaler_folded = bundle.scaler_folded
+        self.scaler = None if self.scaler_folded else bundle.load_scaler()
+
+        # Flattened trees for the native backend are stored in the bundle
+        self.native_model = None
+        if backend == 'native':
+            self.native_model = bundle.load_tree_ensemble()
+            if self.native_model is None:
+                print("Native inference unavailable, using XGBoost")
+
+        # The native engine serves small batches without XGBoost, so only
+        # deserialize the XGBoost model up front when it is the main backend
+        self._xgboost_model = None
+        self._xgboost_lock = threading.Lock()
+        if self.native_model is None:
+            self.xgboost_model()
+
+        # Top 5 features by importance
+        importance = bundle.manifest['feature_importance'][:5]
+        self.feature_importance_data = {
+            'features': [row['feature'] for row in importance],
+            'importance': [row['importance'] for row in importance]
+        }
+
+    def xgboost_model(self):
+        """XGBRegressor for this bundle, deserialized on first use"""
+        if self._xgboost_model is None:
+            with self._xgboost_lock:
+                if self._xgboost_model is None:
+                    model = self.bundle.load_regressor()
+                    if self.nthread:
+                        model.set_params(n_jobs=self.nthread)
+                    self._xgboost_model = model
+        return self._xgboost_model
+
+    @property
+    def xgboost_loaded(self):
+        return self._xgboost_model is not None
+
+    def set_nthread(self, nthread):
+        """Pin the XGBoost predictor's OpenMP threads (None restores XGBoost's default)"""
+        self.nthread = nthread
+        if self._xgboost_model is not None:
+            self._xgboost_model.set_params(n_jobs=nthread)
+
+    def scale(self, feature_matrix):
+        """Apply the StandardScaler unless it is already folded into the model"""
+        if self.scaler_folded:
+            return feature_matrix
+        return self.scaler.transform(feature_matrix)
+
+    def predict(self, feature_matrix_scaled):
+        """Run the configured inference backend over a scaled feature matrix"""
+        if self.native_model is not None and len(feature_matrix_scaled) <= self.native_max_batch:
+            return self.native_model.predict(feature_matrix_scaled)
+        return self.xgboost_model().predict(feature_matrix_scaled)
+
+    def contributions(self, feature_matrix_scaled, exact=False):
+        """Per-feature contributions with a trailing bias column; each row sums to its score
+
+        Saabas path attributions by default, from the native engine for small
+        batches and XGBoost's approx_contribs otherwise; exact=True runs
+        XGBoost's TreeSHAP, which is much slower on large batches.
+        """
+        native = self.native_model
+        if (not exact and native is not None and native.node_mean is not None
+                and len(feature_matrix_scaled) <= self.native_max_batch):
+            return native.contributions(feature_matrix_scaled)
+
+        from xgboost import DMatrix
+        booster = self.xgboost_model().get_booster()
+        # Stop at best_iteration like XGBRegressor.predict
+        best_iteration = booster.attr('best_iteration')
+        iteration_range = (0, int(best_iteration) + 1) if best_iteration is not None else (0, 0)
+        return booster.predict(DMatrix(feature_matrix_scaled, nthread=self.nthread or -1), pred_contribs=True,
+                               approx_contribs=not exact, iteration_range=iteration_range)
+
+    def score(self, feature_matrix):
+        """Scale a raw feature matrix and return one model score per row"""
+        return self.predict(self.scale(feature_matrix))
+
+
+class ModelManager:
+    """Loads, validates and atomically publishes ModelStates for one bundle path"""
+
+    def __init__(self, path, backend='xgboost', native_max_batch=4, validation_inputs=None,
+                 score_range=(-50.0, 150.0), tolerance=1e-3, nthread=None):
+        self.path = path
+        self.backend = backend
+        self.native_max_batch = native_max_batch
+        self.nthread = nthread
+        # Raw feature rows every candidate model must score to finite, in-range values
+        self.validation_inputs = validation_inputs
+        self.score_range = score_range
+        self.tolerance = tolerance
+
+        self.current = None
+        self.last_error = None
+        self.last_swap_seconds = None
+        self.reloads = 0
+        self.reload_failures = 0
+        self._swap_listeners = []
+        self._reload_lock = threading.Lock()
+
+        self._watch_interval = 0
+        self._watch_pid = None
+        self._watch_signature = None
+
+    def on_swap(self, callback):
+        """Call callback(new_state) after every successful swap; usable as a decorator"""
+        self._swap_listeners.append(callback)
+        return callback
+
+    def _file_signature(self, path):
+        stat = os.stat(path)
+        return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+    def validate(self, state):
+        """Warm up the serving backend of state and check it against known inputs
+
+        Raises ModelValidationError on any failure.
+        """
+        checks = []
+        arrays = state.bundle.arrays
+        if 'validation_inputs' in arrays:
+            checks.append((np.array(arrays['validation_inputs']), np.array(arrays['validation_expected'])))
+        if self.validation_inputs is not None:
+            checks.append((np.asarray(self.validation_inputs, dtype=np.float64), None))
+
+        # Score with the backend that serves small requests, which also warms it up;
+        # in native mode XGBoost stays unloaded until a large batch needs it
+        if state.native_model is not None:
+            primary = state.native_model
+        else:
+            primary = state.xgboost_model()
+
+        for inputs, expected in checks:
+            scores = np.asarray(primary.predict(state.scale(inputs)), dtype=np.float64)
+            if not np.all(np.isfinite(scores)):
+                raise ModelValidationError("Model produced non-finite scores")
+            low, high = self.score_range
+            if scores.min() < low or scores.max() > high:
+                raise ModelValidationError(f"Scores outside [{low}, {high}]: {scores.min():.2f}..{scores.max():.2f}")
+            if expected is not None and not np.allclose(scores, expected, atol=self.tolerance, rtol=0):
+                raise ModelValidationError("Scores do not match the predictions stored in the bundle")
+
+        if not checks:
+            # Nothing to compare against, but the model must at least score a row
+            primary.predict(state.scale(np.zeros((1, len(state.bundle.feature_names)))))
+
+    def reload(self, path=None):
+        """Load, warm and validate the bundle at path, then swap it in
+
+        Returns the new state. On failure the current state keeps serving and
+        the exception propagates.
+        """
+        path = path or self.path
+        with self._reload_lock:
+            start = time.perf_counter()
+            # The watcher won't retry this file, even if it fails, until it changes again
+            signature = self._file_signature(path)
+            if path == self.path:
+                self._watch_signature = signature
+            try:
+                state = ModelState(load_bundle(path), self.backend, self.native_max_batch, self.nthread)
+                self.validate(state)
+            except Exception as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+                self.reload_failures += 1
+                raise
+
+            # Publishing is one reference assignment; readers take self.current once per request
+            self.current = state
+            self.last_error = None
+            self.reloads += 1
+            self.last_swap_seconds = round(time.perf_counter() - start, 3)
+            for callback in self._swap_listeners:
+                callback(state)
+            return state
+
+    def set_nthread(self, nthread):
+        """XGBoost threads for the current model and every model loaded after it"""
+        self.nthread = nthread
+        if self.current is not None:
+            self.current.set_nthread(nthread)
+
+    def status(self):
+        return {
+            'model_version': self.current.version if self.current else None,
+            'path': self.path,
+            'last_swap_seconds': self.last_swap_seconds,
+            'last_error': self.last_error,
+            'watching': self._watch_pid == os.getpid()
+        }
+
+    def start_watching(self, interval):
+        """Poll the bundle file every interval seconds and reload when it changes"""
+        self._watch_interval = interval
+        self.ensure_watching()
+
+    def ensure_watching(self):
+        """Start the watcher thread in this process (threads don't survive fork)"""
+        if self._watch_interval <= 0 or self._watch_pid == os.getpid():
+            return
+        self._watch_pid = os.getpid()
+        threading.Thread(target=self._watch, name='model-watcher', daemon=True).start()
+
+    def _watch(self):
+        while True:
+            time.sleep(self._watch_interval)
+            try:
+                if self._file_signature(self.path) == self._watch_signature:
+                    continue
+                state = self.reload()
+                print(f"Model {state.version} swapped in after {self.last_swap_seconds}s")
+            except FileNotFoundError:
+                # Between a delete and a new file being written
+                continue
+            except Exception as e:
+                print(f"Model reload failed, keeping {self.current.version if self.current else 'no model'}: {e}")
@@ -0,0 +1,74 @@
+"""
+Bounded LRU cache of model scores keyed on the model version and the
+ordered feature vector
+"""
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+class PredictionCache:
+    """Thread-safe LRU cache mapping feature vectors to model scores"""
+
+    def __init__(self, capacity, quantization_steps=None):
+        self.capacity = capacity
+        # Per-feature rounding step; 0 keeps the feature exact
+        self.quantization_steps = None
+        if quantization_steps is not None:
+            steps = np.asarray(quantization_steps, dtype=np.float64)
+            if steps.any():
+                self.quantization_steps = np.where(steps > 0, steps, 1.0)
+                self._exact = steps <= 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def make_key(self, feature_row, version=''):
+        """Build the cache key for one feature row scored by the given model version"""
+        row = np.asarray(feature_row, dtype=np.float64)
+        if self.quantization_steps is not None:
+            quantized = np.round(row / self.quantization_steps) * self.quantization_steps
+            row = np.where(self._exact, row, quantized)
+        return version.encode('utf-8') + b'\0' + row.tobytes()
+
+    def get(self, key):
+        """Return the cached score for a key, or None on a miss"""
+        with self._lock:
+            score = self._entries.get(key)
+            if score is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return score
+
+    def put(self, key, score):
+        """Store a score, evicting the least recently used entry when full"""
+        with self._lock:
+            self._entries[key] = score
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drop every entry, e.g. after a new model is loaded"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Hit/miss/eviction counters and current occupancy"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'capacity': self.capacity,
+                'size': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
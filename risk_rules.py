@@ -0,0 +1,97 @@
+"""
+Declarative risk-factor and recommendation rules
+The rule table is compiled into NumPy comparisons so a whole batch of
+feature rows is checked in one pass
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+RiskRule = namedtuple(
+    'RiskRule', ['feature', 'comparator', 'threshold', 'risk_factor', 'recommendation', 'fallback_penalty']
+)
+
+# One row per rule; risk_factor may be None for recommendation-only rules.
+# fallback_penalty is subtracted from the base score when the model is unavailable.
+RISK_RULES = [
+    RiskRule('sleep_duration', '<', 6, "Insufficient sleep duration",
+             "Aim for 7-9 hours of sleep per night", 10),
+    RiskRule('sleep_duration', '>', 10, "Excessive sleep duration",
+             "Consider maintaining a regular sleep schedule", 0),
+    RiskRule('academic_pressure', '>=', 4, "High perceived academic pressure",
+             "Consider stress management techniques and time management skills", 8),
+    RiskRule('social_connectedness', '<=', 2, "Low social connectedness",
+             "Try to build and maintain social relationships", 6),
+    RiskRule('financial_stress', '>=', 4, "High financial stress",
+             "Seek financial counseling or budgeting assistance", 7),
+    RiskRule('physical_activity', '<=', 2, "Low physical activity level",
+             "Incorporate regular exercise into your routine", 5),
+    RiskRule('screen_time', '>=', 10, "Excessive screen time",
+             "Consider digital wellness practices and screen time limits", 0),
+    RiskRule('family_history', '>=', 0.5, "Family history of mental health issues",
+             "Consider discussing family history with a healthcare provider", 0),
+    RiskRule('coping_mechanisms', '<=', 2, "Poor coping mechanisms",
+             "Develop healthy coping strategies like mindfulness or hobbies", 0),
+    RiskRule('treatment_history', '>=', 1, None,
+             "Continue following up with mental health professionals", 0),
+]
+
+# Score the rule-based fallback starts from before penalties
+FALLBACK_BASE_SCORE = 75
+
+COMPARATORS = {
+    '<': np.less,
+    '<=': np.less_equal,
+    '>': np.greater,
+    '>=': np.greater_equal,
+}
+
+
+class CompiledRules:
+    """Rule table bound to a feature order and evaluated as boolean masks"""
+
+    def __init__(self, rules, feature_order):
+        self.rules = list(rules)
+        self.feature_index = np.array([feature_order.index(rule.feature) for rule in self.rules])
+        self.thresholds = np.array([rule.threshold for rule in self.rules], dtype=np.float64)
+        self.penalties = np.array([rule.fallback_penalty for rule in self.rules], dtype=np.float64)
+        # Group rule columns by comparator so each group is one ufunc call
+        self.comparator_groups = [
+            (COMPARATORS[comparator], np.array([i for i, rule in enumerate(self.rules) if rule.comparator == comparator]))
+            for comparator in COMPARATORS
+            if any(rule.comparator == comparator for rule in self.rules)
+        ]
+        self._bit_weights = 1 << np.arange(len(self.rules), dtype=np.int64)
+        self._explanations = {}
+
+    def evaluate(self, feature_matrix):
+        """Return an (n_rows, n_rules) mask of which rules fire for each row"""
+        feature_matrix = np.atleast_2d(np.asarray(feature_matrix, dtype=np.float64))
+        mask = np.empty((feature_matrix.shape[0], len(self.rules)), dtype=bool)
+        for comparator, columns in self.comparator_groups:
+            mask[:, columns] = comparator(feature_matrix[:, self.feature_index[columns]], self.thresholds[columns])
+        return mask
+
+    def explain(self, feature_matrix):
+        """Risk factors and recommendations for every row of a feature matrix"""
+        codes = self.evaluate(feature_matrix) @ self._bit_weights
+        # Likert-scale inputs produce few distinct rule combinations, so build each once
+        explanations = [self._explanation_for(code) for code in codes.tolist()]
+        return [(list(risk_factors), list(recommendations)) for risk_factors, recommendations in explanations]
+
+    def fallback_scores(self, feature_matrix):
+        """Rule-based 0-100 scores used when the model is not available"""
+        scores = FALLBACK_BASE_SCORE - self.evaluate(feature_matrix) @ self.penalties
+        return np.clip(scores, 0, 100).astype(int)
+
+    def _explanation_for(self, code):
+        explanation = self._explanations.get(code)
+        if explanation is None:
+            fired = [rule for i, rule in enumerate(self.rules) if code >> i & 1]
+            explanation = (
+                [rule.risk_factor for rule in fired if rule.risk_factor],
+                [rule.recommendation for rule in fired if rule.recommendation]
+            )
+            self._explanations[code] = explanation
+        return explanation
@@ -0,0 +1,164 @@
+"""
+Server-side storage for per-user assessment results
+The signed cookie only carries the session ID (the user_id from index());
+questionnaire answers and the latest prediction live here, keyed by that ID.
+Records are compact JSON compressed with a preset zlib dictionary of the
+rule texts and field names, so a typical record is a couple of hundred bytes.
+SQLite is shared by every worker process on the host; the in-memory store
+is per process and suits a single-worker development server.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from contextlib import closing
+
+
+class SessionCodec:
+    """Encode session dicts as zlib-compressed compact JSON with a preset dictionary
+
+    The dictionary should hold strings that recur in every record (keys,
+    rule texts); zlib tags each record with the dictionary's checksum, so a
+    record written with a different dictionary fails to decode.
+    """
+
+    def __init__(self, dictionary=b'', level=6):
+        self.dictionary = dictionary
+        self.level = level
+
+    def encode(self, data):
+        compressor = zlib.compressobj(self.level, zdict=self.dictionary) if self.dictionary else zlib.compressobj(self.level)
+        payload = json.dumps(data, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+        return compressor.compress(payload) + compressor.flush()
+
+    def decode(self, blob):
+        decompressor = zlib.decompressobj(zdict=self.dictionary) if self.dictionary else zlib.decompressobj()
+        return json.loads(decompressor.decompress(blob) + decompressor.flush())
+
+
+def build_dictionary(strings):
+    """Preset zlib dictionary from recurring strings; most frequent text goes last"""
+    return ''.join(json.dumps(text, ensure_ascii=False) for text in strings).encode('utf-8')
+
+
+class _SessionStore:
+    def __init__(self, codec, ttl):
+        self.codec = codec
+        self.ttl = ttl
+
+    def get(self, session_id):
+        """Decoded record for session_id, or None if missing, expired or unreadable"""
+        blob = self._get(session_id)
+        if blob is None:
+            return None
+        try:
+            return self.codec.decode(blob)
+        except (zlib.error, ValueError):
+            # Written by an older dictionary or corrupted; treat as no session
+            return None
+
+    def put(self, session_id, data):
+        blob = self.codec.encode(data)
+        self._put(session_id, blob, time.time() + self.ttl)
+        return len(blob)
+
+
+class MemorySessionStore(_SessionStore):
+    """Per-process LRU store with TTL expiry"""
+
+    def __init__(self, codec, ttl, max_entries=10000):
+        super().__init__(codec, ttl)
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, session_id):
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                return None
+            blob, expires = entry
+            if expires < time.time():
+                del self._entries[session_id]
+                return None
+            self._entries.move_to_end(session_id)
+            return blob
+
+    def _put(self, session_id, blob, expires):
+        with self._lock:
+            self._entries[session_id] = (blob, expires)
+            self._entries.move_to_end(session_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {'backend': 'memory', 'sessions': len(self._entries),
+                    'bytes': sum(len(blob) for blob, _ in self._entries.values())}
+
+
+class SQLiteSessionStore(_SessionStore):
+    """SQLite-backed store shared by all worker processes on a host"""
+
+    # Expired rows are purged on every Nth write
+    PURGE_EVERY = 500
+
+    def __init__(self, codec, ttl, path):
+        super().__init__(codec, ttl)
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        # The store is built at import, before gunicorn forks its workers; set
+        # up the schema on a throwaway connection so no connection is inherited
+        with closing(sqlite3.connect(path, timeout=5)) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions (id TEXT PRIMARY KEY, data BLOB NOT NULL, expires REAL NOT NULL)"
+            )
+            conn.commit()
+
+    def _connection(self):
+        # Opened lazily, one per thread and process. A connection found under
+        # another pid was opened before a fork; it is dropped, never used or closed
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def _get(self, session_id):
+        row = self._connection().execute(
+            "SELECT data FROM sessions WHERE id = ? AND expires >= ?", (session_id, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def _put(self, session_id, blob, expires):
+        conn = self._connection()
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO sessions (id, data, expires) VALUES (?, ?, ?)",
+                         (session_id, blob, expires))
+            self._writes += 1
+            if self._writes % self.PURGE_EVERY == 0:
+                conn.execute("DELETE FROM sessions WHERE expires < ?", (time.time(),))
+
+    def stats(self):
+        count, size = self._connection().execute(
+            "SELECT COUNT(*), COALESCE(SUM(LENGTH(data)), 0) FROM sessions WHERE expires >= ?", (time.time(),)
+        ).fetchone()
+        return {'backend': 'sqlite', 'sessions': count, 'bytes': size}
+
+
+def create_session_store(backend, codec, ttl, path=None, max_entries=10000):
+    """Build the store named by backend ('sqlite' or 'memory')"""
+    if backend == 'sqlite':
+        return SQLiteSessionStore(codec, ttl, path)
+    if backend == 'memory':
+        return MemorySessionStore(codec, ttl, max_entries)
+    raise ValueError(f"Unknown session store backend: {backend}")
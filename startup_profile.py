@@ -0,0 +1,122 @@
+"""
+Startup profile for the serving process
+Records how long each boot phase of app.py takes (imports, model load, first
+prediction). Run as a script to profile a cold interpreter: every import made
+by app.py is timed with -X importtime and a first prediction is made.
+
+    python startup_profile.py [--backend native] [--top 15]
+"""
+
+import json
+import os
+import sys
+import time
+
+# Time between Python starting and this module being imported is not counted
+_ORIGIN = time.perf_counter()
+
+
+class StartupProfile:
+    """Wall-clock milestones since the serving module started importing"""
+
+    def __init__(self, origin=None):
+        self.origin = _ORIGIN if origin is None else origin
+        self.phases = {}
+
+    def mark(self, phase):
+        """Record a milestone the first time it is reached"""
+        if phase not in self.phases:
+            self.phases[phase] = round((time.perf_counter() - self.origin) * 1000, 2)
+
+    def report(self):
+        return {
+            'phases_ms': dict(self.phases),
+            'loaded_modules': sorted(name for name in ('pandas', 'xgboost', 'sklearn', 'plotly') if name in sys.modules)
+        }
+
+
+# Shared by app.py and anything it imports
+startup = StartupProfile()
+
+
+# Child process for the CLI: imports the app and makes one prediction
+_PROFILE_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import app
+app.make_prediction({})
+report = app.startup.report()
+report['wall_ms'] = round((time.perf_counter() - start) * 1000, 2)
+sys.stdout.write('STARTUP_REPORT ' + json.dumps(report) + '\\n')
+"""
+
+
+def parse_importtime(stderr, module='app'):
+    """Cumulative microseconds of each import made directly by module, from -X importtime output"""
+    totals, pending = {}, {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if not cumulative.strip().isdigit():
+            continue
+        # Children are listed before their parent, indented two spaces per level
+        depth = (len(name) - len(name.lstrip(' ')) - 1) // 2
+        name = name.strip()
+        if depth == 1:
+            pending[name] = pending.get(name, 0) + int(cumulative)
+        elif depth == 0:
+            if name == module:
+                totals = pending
+            pending = {}
+    return totals
+
+
+def profile_cold_start(backend=None):
+    """Import app.py in a fresh interpreter; returns (report, import times in ms)"""
+    import subprocess
+
+    env = dict(os.environ)
+    if backend:
+        env['PREDICTION_BACKEND'] = backend
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', _PROFILE_SCRIPT],
+        cwd=os.path.dirname(os.path.abspath(__file__)), env=env,
+        capture_output=True, text=True, check=True
+    )
+    report = None
+    for line in result.stdout.splitlines():
+        if line.startswith('STARTUP_REPORT '):
+            report = json.loads(line[len('STARTUP_REPORT '):])
+    imports_ms = {name: round(us / 1000, 2) for name, us in parse_importtime(result.stderr).items()}
+    return report, imports_ms
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Profile cold start of the serving app")
+    parser.add_argument('--backend', choices=['xgboost', 'native'], default=None)
+    parser.add_argument('--top', type=int, default=15, help="slowest imports to show")
+    parser.add_argument('--json', action='store_true', help="print the full result as JSON")
+    args = parser.parse_args()
+
+    report, imports_ms = profile_cold_start(args.backend)
+    slowest = sorted(imports_ms.items(), key=lambda item: item[1], reverse=True)[:args.top]
+
+    if args.json:
+        print(json.dumps({'report': report, 'imports_ms': dict(slowest)}, indent=2))
+        return
+
+    print("Slowest imports made by app.py (cumulative ms):")
+    for name, ms in slowest:
+        print(f"  {ms:9.1f}  {name}")
+    print("Boot phases (ms since app import began):")
+    for phase, ms in report['phases_ms'].items():
+        print(f"  {ms:9.1f}  {phase}")
+    print(f"Heavy modules loaded: {', '.join(report['loaded_modules']) or 'none'}")
+    print(f"Import + first prediction wall time: {report['wall_ms']:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
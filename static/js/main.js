@@ -883,14 +883,12 @@ document.addEventListener('DOMContentLoaded', function() {
         const formData = new FormData(form);
         const data = Object.fromEntries(formData);
 
-        // Convert checkbox values to boolean
-        data.family_history = !!formData.get('family_history');
-        data.treatment_history = !!formData.get('treatment_history');
-
-        // Convert numeric strings to numbers
-        ['age', 'academic_year', 'cgpa', 'sleep_duration', 'physical_activity', 
+        // Convert numeric strings to numbers; academic_year stays a string ('graduate'),
+        // and the history radios carry graded values (0 / 0.5 / 1, 0 / 1 / 2), not booleans
+        ['age', 'cgpa', 'sleep_duration', 'physical_activity', 
          'screen_time', 'academic_pressure', 'social_connectedness', 
-         'coping_mechanisms', 'financial_stress', 'dietary_habits'].forEach(field => {
+         'coping_mechanisms', 'financial_stress', 'dietary_habits',
+         'family_history', 'treatment_history'].forEach(field => {
             if (data[field]) {
                 data[field] = Number(data[field]);
             }
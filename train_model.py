@@ -6,12 +6,23 @@ Trains XGBoost models on synthetic mental health datasets
 import pandas as pd
 import numpy as np
 import xgboost as xgb
-from sklearn.model_selection import train_test_split, GridSearchCV
+from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler, LabelEncoder
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score
-import pickle
 import os
+import copy
+import json
+import time
+import argparse
 from datetime import datetime
+from hyperparameter_search import successive_halving_search
+from training_scheduler import available_cpus, scheduled_grid_search
+from model_bundle import write_bundle
+from columnar_dataset import read_table, write_dataset
+
+MODEL_BUNDLE_PATH = 'models/mental_health_model.bundle'
+# Known inputs stored with their predictions in the bundle for reload validation
+VALIDATION_ROWS = 16
 
 # Set random seed for reproducibility
 np.random.seed(42)
@@ -128,8 +139,12 @@ def generate_synthetic_dataset(n_samples=10000):
     
     return data
 
-def train_xgboost_model(data):
-    """Train XGBoost model with hyperparameter tuning"""
+def train_xgboost_model(data, search='grid', budget_seconds=None):
+    """Train XGBoost model with hyperparameter tuning
+    
+    search='grid' runs the exhaustive CV grid search; search='halving' runs a
+    budgeted successive-halving search with early stopping instead.
+    """
     
     print("Training XGBoost model...")
     
@@ -161,22 +176,33 @@ def train_xgboost_model(data):
         'colsample_bytree': [0.8, 0.9]
     }
     
-    xgb_model = xgb.XGBRegressor(random_state=42, objective='reg:squarederror')
-    
     print("Performing hyperparameter tuning...")
-    grid_search = GridSearchCV(
-        xgb_model, 
-        param_grid, 
-        cv=3, 
-        scoring='neg_mean_squared_error',
-        n_jobs=-1,
-        verbose=1
-    )
-    
-    grid_search.fit(X_train_scaled, y_train)
-    
-    # Best model
-    best_model = grid_search.best_estimator_
+    search_start = time.perf_counter()
+    if search == 'halving':
+        best_params, best_rmse, trials = successive_halving_search(
+            X_train_scaled, y_train.to_numpy(), param_grid,
+            base_params={'random_state': 42, 'objective': 'reg:squarederror'},
+            budget_seconds=budget_seconds,
+            log_path='models/search_trials.json'
+        )
+        print(f"Successive halving: {len(trials)} trials, validation RMSE {best_rmse:.3f}")
+        
+        best_model = xgb.XGBRegressor(random_state=42, objective='reg:squarederror', **best_params)
+        best_model.fit(X_train_scaled, y_train)
+    else:
+        # Cores are split between concurrent CV fits and per-fit XGBoost threads
+        best_params, best_rmse, schedule = scheduled_grid_search(
+            X_train_scaled, y_train.to_numpy(), param_grid, cv=3,
+            base_params={'random_state': 42, 'objective': 'reg:squarederror'}
+        )
+        print(f"Grid search: {schedule['fits']} fits on {schedule['concurrent_fits']} processes x "
+              f"{schedule['threads_per_fit']} threads, core utilization {schedule['core_utilization']:.0%}")
+        
+        # Refit the best candidate on the full training set with every core
+        best_model = xgb.XGBRegressor(random_state=42, objective='reg:squarederror',
+                                      n_jobs=available_cpus(), **best_params)
+        best_model.fit(X_train_scaled, y_train)
+    search_seconds = time.perf_counter() - search_start
     
     # Predictions
     y_pred = best_model.predict(X_test_scaled)
@@ -192,7 +218,8 @@ def train_xgboost_model(data):
     f1 = f1_score(y_test_class, y_pred_class, average='weighted')
     
     print(f"\nModel Performance:")
-    print(f"Best Parameters: {grid_search.best_params_}")
+    print(f"Best Parameters: {best_params}")
+    print(f"Search time ({search}): {search_seconds:.1f}s")
     print(f"Accuracy: {accuracy:.3f}")
     print(f"Precision: {precision:.3f}")
     print(f"Recall: {recall:.3f}")
@@ -213,67 +240,124 @@ def train_xgboost_model(data):
         'precision': precision,
         'recall': recall,
         'f1_score': f1,
-        'best_params': grid_search.best_params_
+        'best_params': best_params,
+        'search': search,
+        'search_seconds': search_seconds
     }
 
-def save_model_artifacts(model, scaler, feature_importance, metrics):
-    """Save model and associated artifacts"""
+def _folded_threshold(threshold, mean, scale):
+    """Smallest float32 raw value that the scaled split would send right"""
+    def goes_left(raw):
+        # Reproduce StandardScaler.transform followed by XGBoost's float32 cast
+        return np.float32((np.float64(raw) - mean) / scale) < np.float32(threshold)
+    
+    candidate = np.float32(np.float64(threshold) * scale + mean)
+    # Nudge by one ULP at a time until the raw split matches the scaled split exactly
+    while goes_left(candidate):
+        candidate = np.nextafter(candidate, np.float32(np.inf))
+    while not goes_left(np.nextafter(candidate, np.float32(-np.inf))):
+        candidate = np.nextafter(candidate, np.float32(-np.inf))
+    return float(candidate)
+
+def fold_scaler_into_model(model, scaler):
+    """Return a copy of the model whose splits operate on unscaled features
+    
+    Tree splits are invariant under the StandardScaler affine transform, so
+    each threshold t on feature f becomes t * scale[f] + mean[f].
+    """
+    n_features = scaler.n_features_in_
+    mean = scaler.mean_ if scaler.mean_ is not None else np.zeros(n_features)
+    scale = scaler.scale_ if scaler.scale_ is not None else np.ones(n_features)
+    
+    model_json = json.loads(model.get_booster().save_raw('json'))
+    for tree in model_json['learner']['gradient_booster']['model']['trees']:
+        conditions = tree['split_conditions']
+        for node, (left, feature) in enumerate(zip(tree['left_children'], tree['split_indices'])):
+            if left != -1:  # leaves store their value in split_conditions
+                conditions[node] = _folded_threshold(conditions[node], mean[feature], scale[feature])
+    
+    folded_model = copy.deepcopy(model)
+    folded_model.get_booster().load_model(bytearray(json.dumps(model_json).encode()))
+    return folded_model
+
+def save_model_artifacts(model, scaler, feature_importance, metrics, validation_inputs=None):
+    """Save the model and everything serving needs as a single bundle
+
+    validation_inputs are raw feature rows whose predictions are stored in the
+    bundle; the serving app checks a new model reproduces them before swapping it in.
+    """
     
     print("Saving model artifacts...")
     
     # Create models directory
     os.makedirs('models', exist_ok=True)
     
-    # Save model
-    with open('models/xgboost_mental_health_model.pkl', 'wb') as f:
-        pickle.dump(model, f)
-    
-    # Save scaler
-    with open('models/feature_scaler.pkl', 'wb') as f:
-        pickle.dump(scaler, f)
-    
-    # Save feature importance
-    feature_importance.to_csv('models/feature_importance.csv', index=False)
-    
-    # Save metrics
-    with open('models/model_metrics.pkl', 'wb') as f:
-        pickle.dump(metrics, f)
-    
-    # Save training metadata
+    # Training metadata
     metadata = {
         'training_date': datetime.now().isoformat(),
         'model_type': 'XGBoost Regressor',
-        'features': feature_importance['feature'].tolist(),
-        'metrics': metrics
+        'features': feature_importance['feature'].tolist()
     }
     
-    with open('models/model_metadata.pkl', 'wb') as f:
-        pickle.dump(metadata, f)
+    # Scaler-folded model (takes raw feature values), scaler parameters,
+    # feature importance and metrics in one memory-mappable file
+    manifest = write_bundle(
+        MODEL_BUNDLE_PATH,
+        fold_scaler_into_model(model, scaler),
+        feature_names=scaler.feature_names_in_.tolist(),
+        scaler=scaler,
+        scaler_folded=True,
+        feature_importance=feature_importance.to_dict('records'),
+        metrics=metrics,
+        metadata=metadata,
+        validation_inputs=validation_inputs
+    )
     
-    print("Model artifacts saved successfully!")
+    print(f"Model bundle {manifest['model_version']} saved to {MODEL_BUNDLE_PATH}")
 
 def main():
     """Main training pipeline"""
     
+    parser = argparse.ArgumentParser(description="Train the mental health XGBoost model")
+    parser.add_argument('--search', choices=['grid', 'halving'], default='grid',
+                        help="exhaustive CV grid search or budgeted successive halving")
+    parser.add_argument('--budget', type=float, default=None,
+                        help="wall-clock budget in seconds for --search halving")
+    parser.add_argument('--data', default=None,
+                        help="train on a saved dataset (CSV or columnar .cols) instead of generating one")
+    parser.add_argument('--save-data', default=None,
+                        help="also write the generated dataset here in the columnar format")
+    args = parser.parse_args()
+    
     print("=== Mental Health Prediction Model Training ===")
     print(f"Training started at: {datetime.now()}")
     
-    # Generate multiple datasets for better generalization
-    datasets = []
-    for i in range(3):  # Train on 3 different synthetic datasets
-        print(f"\nGenerating dataset {i+1}/3...")
-        dataset = generate_synthetic_dataset(n_samples=3500)
-        datasets.append(dataset)
-    
-    # Combine datasets
-    combined_data = pd.concat(datasets, ignore_index=True)
-    print(f"\nCombined dataset size: {len(combined_data)} samples")
+    if args.data:
+        # Compact stored dtypes are widened so the scaler is fitted in float64 as for generated data
+        combined_data = read_table(args.data).astype(np.float64)
+        print(f"\nLoaded {len(combined_data)} samples from {args.data}")
+    else:
+        # Generate multiple datasets for better generalization
+        datasets = []
+        for i in range(3):  # Train on 3 different synthetic datasets
+            print(f"\nGenerating dataset {i+1}/3...")
+            dataset = generate_synthetic_dataset(n_samples=3500)
+            datasets.append(dataset)
+        
+        # Combine datasets
+        combined_data = pd.concat(datasets, ignore_index=True)
+        print(f"\nCombined dataset size: {len(combined_data)} samples")
+        if args.save_data:
+            write_dataset(args.save_data, combined_data)
+            print(f"Dataset saved to {args.save_data}")
     
     # Train model
-    model, scaler, feature_importance, metrics = train_xgboost_model(combined_data)
+    os.makedirs('models', exist_ok=True)
+    model, scaler, feature_importance, metrics = train_xgboost_model(combined_data, args.search, args.budget)
     
     # Save everything
-    save_model_artifacts(model, scaler, feature_importance, metrics)
+    validation_inputs = combined_data[scaler.feature_names_in_].sample(VALIDATION_ROWS, random_state=42)
+    save_model_artifacts(model, scaler, feature_importance, metrics, validation_inputs)
     
     print(f"\n=== Training completed at: {datetime.now()} ===")
     print("Model ready for deployment!")
@@ -0,0 +1,216 @@
+"""
+Native NumPy inference engine for XGBoost tree ensembles
+Flattens the trees of a trained booster into contiguous arrays and scores
+whole batches with vectorized traversal, bypassing DMatrix construction
+"""
+
+import json
+import numpy as np
+
+# Objectives whose prediction is the raw margin (identity link)
+IDENTITY_OBJECTIVES = {
+    'reg:squarederror', 'reg:squaredlogerror', 'reg:pseudohubererror',
+    'reg:absoluteerror', 'reg:quantileerror'
+}
+
+
+class TreeEnsemble:
+    """Tree ensemble stored as flat node arrays shared by every tree"""
+
+    # Array attributes, in the order they are stored in a model bundle
+    ARRAY_FIELDS = ('feature', 'threshold', 'left', 'right', 'default_left', 'value', 'roots', 'children')
+    # Stored when available; bundles written before they existed still load
+    OPTIONAL_ARRAY_FIELDS = ('node_mean',)
+
+    def __init__(self, feature, threshold, left, right, default_left, value,
+                 roots, base_score, max_depth, num_features, children=None, node_mean=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.default_left = default_left
+        self.value = value
+        self.roots = roots
+        self.base_score = base_score
+        self.max_depth = max_depth
+        self.num_features = num_features
+        # Interleaved (right, left) children so one take() picks the next node
+        self.children = children if children is not None else np.stack([right, left], axis=1).ravel()
+        # Cover-weighted mean leaf value below every node, for Saabas contributions
+        self.node_mean = node_mean
+
+    @classmethod
+    def from_booster(cls, booster):
+        """Build the engine from an xgboost.Booster (or its JSON model dict)"""
+        if isinstance(booster, dict):
+            model_json = booster
+            best_iteration = None
+        else:
+            model_json = json.loads(booster.save_raw('json'))
+            best_iteration = booster.attr('best_iteration')
+
+        learner = model_json['learner']
+        objective = learner['objective']['name']
+        if objective not in IDENTITY_OBJECTIVES:
+            raise ValueError(f"Unsupported objective for native inference: {objective}")
+
+        model_param = learner['learner_model_param']
+        if int(model_param.get('num_target', 1)) > 1 or int(model_param.get('num_class', 0)) > 0:
+            raise ValueError("Native inference only supports single-output regressors")
+
+        gbtree = learner['gradient_booster']
+        if gbtree['name'] != 'gbtree':
+            raise ValueError(f"Unsupported booster type: {gbtree['name']}")
+
+        trees = gbtree['model']['trees']
+        # Match the sklearn wrapper, which stops at best_iteration after early stopping
+        if best_iteration is not None:
+            iteration_indptr = gbtree['model']['iteration_indptr']
+            trees = trees[:iteration_indptr[int(best_iteration) + 1]]
+
+        features, thresholds, lefts, rights, defaults, values, roots, means = [], [], [], [], [], [], [], []
+        max_depth = 0
+        offset = 0
+        for tree in trees:
+            if any(tree['split_type']):
+                raise ValueError("Categorical splits are not supported by native inference")
+
+            left = np.asarray(tree['left_children'], dtype=np.int32)
+            right = np.asarray(tree['right_children'], dtype=np.int32)
+            is_leaf = left == -1
+            node_ids = np.arange(len(left), dtype=np.int32)
+
+            # Leaves point back at themselves so traversal can run a fixed number of steps
+            left = np.where(is_leaf, node_ids, left) + offset
+            right = np.where(is_leaf, node_ids, right) + offset
+
+            split_conditions = np.asarray(tree['split_conditions'], dtype=np.float32)
+            features.append(np.where(is_leaf, 0, tree['split_indices']).astype(np.int32))
+            thresholds.append(np.where(is_leaf, np.float32(0), split_conditions))
+            values.append(np.where(is_leaf, split_conditions, np.float32(0)))
+            defaults.append(np.asarray(tree['default_left'], dtype=bool))
+            lefts.append(left)
+            rights.append(right)
+            roots.append(offset)
+            means.append(_node_means(tree['left_children'], tree['right_children'],
+                                     tree['split_conditions'], tree['sum_hessian']))
+
+            max_depth = max(max_depth, _tree_depth(tree['left_children'], tree['right_children']))
+            offset += len(node_ids)
+
+        return cls(
+            feature=np.concatenate(features),
+            threshold=np.concatenate(thresholds).astype(np.float32),
+            left=np.concatenate(lefts),
+            right=np.concatenate(rights),
+            default_left=np.concatenate(defaults),
+            value=np.concatenate(values).astype(np.float32),
+            roots=np.asarray(roots, dtype=np.int32),
+            base_score=float(model_param['base_score']),
+            max_depth=max_depth,
+            num_features=int(model_param['num_feature']),
+            node_mean=np.concatenate(means)
+        )
+
+    def to_arrays(self):
+        """Flat arrays and scalar parameters, e.g. for writing into a model bundle"""
+        arrays = {name: getattr(self, name) for name in self.ARRAY_FIELDS + self.OPTIONAL_ARRAY_FIELDS
+                  if getattr(self, name) is not None}
+        params = {'base_score': self.base_score, 'max_depth': self.max_depth, 'num_features': self.num_features}
+        return arrays, params
+
+    @classmethod
+    def from_arrays(cls, arrays, params):
+        """Rebuild the engine around existing (possibly memory-mapped) arrays without copying"""
+        optional = {name: arrays.get(name) for name in cls.OPTIONAL_ARRAY_FIELDS}
+        return cls(base_score=params['base_score'], max_depth=params['max_depth'],
+                   num_features=params['num_features'], **{name: arrays[name] for name in cls.ARRAY_FIELDS},
+                   **optional)
+
+    def _steps(self, X):
+        """Yield (nodes, next nodes) for every level of a fixed-depth traversal"""
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.num_features:
+            raise ValueError(f"Expected {self.num_features} features, got {X.shape[1]}")
+
+        X = np.ascontiguousarray(X)
+        flat = X.ravel()
+        row_offsets = (np.arange(X.shape[0], dtype=np.intp) * self.num_features)[:, None]
+        nodes = np.repeat(self.roots[None, :], X.shape[0], axis=0)
+        has_missing = np.isnan(flat).any()
+
+        for _ in range(self.max_depth):
+            x = flat.take(row_offsets + self.feature.take(nodes))
+            go_left = x < self.threshold.take(nodes)
+            if has_missing:
+                go_left = np.where(np.isnan(x), self.default_left.take(nodes), go_left)
+            next_nodes = self.children.take(2 * nodes + go_left)
+            yield nodes, next_nodes
+            nodes = next_nodes
+
+    def leaf_indices(self, X):
+        """Return the global leaf node reached by every row in every tree"""
+        nodes = np.repeat(self.roots[None, :], len(np.atleast_2d(X)), axis=0)
+        for _, nodes in self._steps(X):
+            pass
+        return nodes
+
+    def contributions(self, X):
+        """Saabas feature contributions: (n, num_features + 1), last column the bias
+
+        Each split on the path credits its feature with the change in the mean
+        leaf value below the node, so every row sums to its prediction. Costs
+        one traversal, the same as predict().
+        """
+        if self.node_mean is None:
+            raise ValueError("Model has no node means; rebuild it to compute contributions")
+        n_rows = len(np.atleast_2d(X))
+        width = self.num_features + 1
+        row_base = (np.arange(n_rows, dtype=np.intp) * width)[:, None]
+        contributions = np.zeros(n_rows * width, dtype=np.float64)
+        for nodes, next_nodes in self._steps(X):
+            # Leaves loop back on themselves, so finished trees add zero to feature 0
+            delta = self.node_mean.take(next_nodes) - self.node_mean.take(nodes)
+            contributions += np.bincount((row_base + self.feature.take(nodes)).ravel(),
+                                         weights=delta.ravel(), minlength=n_rows * width)
+        contributions = contributions.reshape(n_rows, width)
+        contributions[:, -1] = self.base_score + self.node_mean.take(self.roots).sum(dtype=np.float64)
+        return contributions
+
+    def predict(self, X):
+        """Predict raw scores for a 2-D feature matrix"""
+        nodes = self.leaf_indices(X)
+        return (self.base_score + self.value.take(nodes).sum(axis=1, dtype=np.float64)).astype(np.float32)
+
+
+def _node_means(left_children, right_children, split_conditions, sum_hessian):
+    """Cover-weighted mean leaf value below each node of one tree (leaves: their value)"""
+    means = np.zeros(len(left_children), dtype=np.float64)
+    # Post-order: children are resolved before their parent
+    stack = [(0, False)]
+    while stack:
+        node, children_done = stack.pop()
+        left, right = left_children[node], right_children[node]
+        if left == -1:
+            means[node] = split_conditions[node]
+        elif children_done:
+            means[node] = (sum_hessian[left] * means[left] + sum_hessian[right] * means[right]) / sum_hessian[node]
+        else:
+            stack.extend([(node, True), (left, False), (right, False)])
+    return means.astype(np.float32)
+
+
+def _tree_depth(left_children, right_children):
+    """Depth of the deepest leaf in a tree given its child arrays"""
+    depth = 0
+    stack = [(0, 0)]
+    while stack:
+        node, level = stack.pop()
+        if left_children[node] == -1:
+            depth = max(depth, level)
+        else:
+            stack.append((left_children[node], level + 1))
+            stack.append((right_children[node], level + 1))
+    return depth